@@ -0,0 +1,117 @@
+from .models import AutocompleteEntry, CustomUser, Tag, TermHead
+
+# Prefix autocomplete for users and tags. Every searchable term (username,
+# each word of the display name, the whole display name, the tag name) is
+# a row in AutocompleteEntry, and a lookup returns the heaviest CANDIDATES
+# rows starting with the prefix:
+#   - prefixes of up to SHORT_PREFIX characters match a large share of all
+#     terms, so they go through the (kind, first N characters, weight)
+#     expression indexes, which yield rows already in weight order; the
+#     lookup stops after CANDIDATES rows whatever the table size.
+#   - longer prefixes are a range scan on the (kind, term, weight) index.
+#     That only touches rows starting with the prefix, but they still have
+#     to be sorted by weight; by three characters there are few enough.
+
+# Rows fetched per lookup; more than `limit` since one user matches a
+# prefix through several terms.
+CANDIDATES = 50
+LIMIT = 10
+
+# Longest prefix with its own index (see AutocompleteEntry.Meta.indexes)
+SHORT_PREFIX = 2
+
+# Sorts after any character that can appear in a term
+_RANGE_END = '\U0010ffff'
+
+_USER_FIELDS = {'username', 'first_name', 'last_name', 'restaurant_name', 'user_type', 'num_followers'}
+
+
+def normalize(text):
+    return ' '.join((text or '').lower().split())
+
+
+def user_terms(user):
+    names = [user.username, user.first_name, user.last_name, user.get_display_name()]
+    if user.restaurant_name:
+        names.append(user.restaurant_name)
+
+    terms = set()
+    for name in names:
+        name = normalize(name)
+        if name:
+            terms.add(name)
+            terms.update(name.split())
+    return terms
+
+
+def index_user(user, update_fields=None):
+    if update_fields is not None and not _USER_FIELDS & set(update_fields):
+        return  # e.g. a last_login update
+    AutocompleteEntry.objects.filter(kind='user', object_id=user.pk).delete()
+    AutocompleteEntry.objects.bulk_create([
+        AutocompleteEntry(kind='user', object_id=user.pk, term=term[:255],
+                          label=user.username, weight=user.num_followers)
+        for term in user_terms(user)
+    ])
+    # `user` may be request.user, loaded before a concurrent follow
+    AutocompleteEntry.reweight_user(user.pk)
+
+
+def index_tag(tag):
+    # Leaves `weight` alone on rename; it is set by the popularity job.
+    AutocompleteEntry.objects.update_or_create(
+        kind='tag', object_id=tag.pk,
+        defaults={'term': normalize(tag.name), 'label': tag.name},
+    )
+
+
+def remove(kind, object_id):
+    AutocompleteEntry.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def suggest(kind, query, limit=LIMIT, exclude_id=None):
+    # Returns [(object_id, label)], exact matches first, then by weight.
+    prefix = normalize(query).lstrip('@#')
+    if not prefix:
+        return []
+
+    entries = AutocompleteEntry.objects.filter(kind=kind).values_list('object_id', 'label')
+    exact = entries.filter(term=prefix).order_by('-weight')[:CANDIDATES]
+    if len(prefix) <= SHORT_PREFIX:
+        matches = (
+            entries.alias(head=TermHead('term', len(prefix)))
+            .filter(head=prefix)
+            .order_by('-weight')[:CANDIDATES]
+        )
+    else:
+        matches = (
+            entries.filter(term__gte=prefix, term__lt=prefix + _RANGE_END)
+            .order_by('-weight', 'term')[:CANDIDATES]
+        )
+
+    results, seen = [], {exclude_id}
+    for object_id, label in [*exact, *matches]:
+        if object_id not in seen:
+            seen.add(object_id)
+            results.append((object_id, label))
+            if len(results) >= limit:
+                break
+    return results
+
+
+def rebuild(batch_size=1000):
+    AutocompleteEntry.objects.all().delete()
+    entries = []
+    for user in CustomUser.objects.iterator(chunk_size=batch_size):
+        entries += [
+            AutocompleteEntry(kind='user', object_id=user.pk, term=term[:255],
+                              label=user.username, weight=user.num_followers)
+            for term in user_terms(user)
+        ]
+        if len(entries) >= batch_size:
+            AutocompleteEntry.objects.bulk_create(entries)
+            entries = []
+    for tag in Tag.objects.iterator(chunk_size=batch_size):
+        entries.append(AutocompleteEntry(kind='tag', object_id=tag.pk, term=normalize(tag.name), label=tag.name))
+    AutocompleteEntry.objects.bulk_create(entries, batch_size=batch_size)
+    return AutocompleteEntry.objects.count()
@@ -1,7 +1,19 @@
-from .models import Message
+from django.utils.functional import SimpleLazyObject
+
+from .counters import unread_messages
+
 
 def unread_message_count(request):
+    # Lazy: only pages that actually render the badge touch the cache/DB.
+    def count():
+        if request.user.is_authenticated:
+            return unread_messages.get(request.user.id)
+        return 0
+    return {'unread_message_count': SimpleLazyObject(count)}
+
+
+def unread_notification_count(request):
+    # A column on the already-loaded user row, so no extra query
     if request.user.is_authenticated:
-        count = Message.objects.filter(recipient=request.user, is_read=False).count()
-        return {'unread_message_count': count}
+        return {'unread_notification_count': request.user.num_unread_notifications}
     return {}
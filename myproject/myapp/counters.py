@@ -0,0 +1,46 @@
+from django.core.cache import cache
+
+from .models import Message
+
+# Per-user counters kept in the cache. Writers nudge them with incr/decr;
+# a missing or expired key is recomputed from the database, so the value
+# self-heals within `timeout` if an update is ever lost. The cache must be
+# shared by all processes (settings.CACHES), or one process's updates are
+# invisible to the others.
+
+
+class CachedCounter:
+    def __init__(self, name, compute, timeout=60 * 5):
+        self.name = name
+        self.compute = compute
+        self.timeout = timeout
+
+    def key(self, user_id):
+        return f'{self.name}:{user_id}'
+
+    def get(self, user_id):
+        value = cache.get(self.key(user_id))
+        if value is None:
+            value = self.compute(user_id)
+            cache.set(self.key(user_id), value, self.timeout)
+        return value
+
+    def incr(self, user_id, delta=1):
+        try:
+            value = cache.incr(self.key(user_id), delta)
+        except ValueError:
+            return  # not cached; the next get() computes it
+        if value < 0:
+            cache.delete(self.key(user_id))
+
+    def decr(self, user_id, delta=1):
+        self.incr(user_id, -delta)
+
+    def reset(self, user_id):
+        cache.delete(self.key(user_id))
+
+
+unread_messages = CachedCounter(
+    'unread_messages',
+    lambda user_id: Message.objects.filter(recipient_id=user_id, is_read=False).count(),
+)
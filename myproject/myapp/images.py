@@ -0,0 +1,175 @@
+import base64
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Resized copies of uploaded images. After an upload, the 'image_variants'
+# job (myapp/tasks.py) writes one JPEG and one WebP per variant and records
+# them in the model's `<field>_variants` JSON column:
+#
+#   {'source': 'recipe_images/pie.jpg',
+#    'card': {'jpeg': <storage name>, 'webp': <storage name>, 'width': 640, 'height': 480}, ...}
+#
+# A source that can't be decoded is recorded as {'source': ..., 'error': ...}
+# so it isn't queued again on every save; a new upload replaces it.
+#
+# Templates pick a variant per slot with the tags in templatetags/custom_tags.py
+# and fall back to the original until the variants exist.
+
+# name: (width, height, crop to fill)
+VARIANTS = {
+    'thumb': (240, 240, True),   # avatars and small previews
+    'card': (640, 640, False),   # feed / grid cards
+    'full': (1600, 1600, False),  # detail pages
+}
+
+# Missing, unreadable or corrupt sources: retrying won't help
+DECODE_ERRORS = (OSError, ValueError, SyntaxError, Image.DecompressionBombError)
+
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+# Inline placeholder: a JPEG this many pixels on the long side, stored as a
+# data: URI (well under 1 KB) and blown up behind the lazy-loaded image.
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 50
+
+# Models and the image fields that get variants
+IMAGE_FIELDS = {
+    'myapp.recipe': ['image'],
+    'myapp.customuser': ['profile_picture'],
+    'myapp.specialoffer': ['image'],
+}
+
+
+def variants_field(field_name):
+    return f'{field_name}_variants'
+
+
+def current_variants(fieldfile):
+    # The variants of `fieldfile`, or {} while they are missing or stale.
+    if not fieldfile:
+        return {}
+    variants = getattr(fieldfile.instance, variants_field(fieldfile.field.name), None) or {}
+    return variants if variants.get('source') == fieldfile.name else {}
+
+
+def has_placeholder(instance, field_name):
+    # Models with <field>_width / _height / _placeholder columns
+    return hasattr(instance, f'{field_name}_placeholder')
+
+
+def needs_variants(instance, field_name):
+    fieldfile = getattr(instance, field_name)
+    variants = getattr(instance, variants_field(field_name)) or {}
+    if (fieldfile.name or '') != (variants.get('source') or ''):
+        return True
+    if variants.get('error'):
+        return False
+    # Built before placeholders existed
+    return bool(fieldfile) and has_placeholder(instance, field_name) and not getattr(instance, f'{field_name}_placeholder')
+
+
+def placeholder(fieldfile):
+    # (data URI, width, height) of `fieldfile`, or None until computed.
+    instance, name = fieldfile.instance, fieldfile.field.name
+    if not has_placeholder(instance, name) or not current_variants(fieldfile):
+        return None
+    data = getattr(instance, f'{name}_placeholder')
+    return (data, getattr(instance, f'{name}_width'), getattr(instance, f'{name}_height')) if data else None
+
+
+def build_variants(instance, field_name):
+    # Writes the variant files for `instance.<field_name>` and stores their
+    # paths. Files of the previous source are removed. The resizing runs
+    # outside any transaction; only the final UPDATE writes to the table.
+    fieldfile = getattr(instance, field_name)
+    old = getattr(instance, variants_field(field_name)) or {}
+
+    variants = {}
+    details = {}
+    if fieldfile:
+        try:
+            with fieldfile.open('rb') as source:
+                original = ImageOps.exif_transpose(Image.open(source))
+                original.load()
+        except DECODE_ERRORS as exc:
+            if _record_failure(instance, field_name, fieldfile, exc):
+                delete_files(old)
+            raise
+        if original.mode not in ('RGB', 'L'):
+            original = original.convert('RGBA')
+            flattened = Image.new('RGB', original.size, 'white')
+            flattened.paste(original, mask=original.getchannel('A'))
+            original = flattened
+        original = original.convert('RGB')
+
+        stem = os.path.splitext(os.path.basename(fieldfile.name))[0]
+        for name, (width, height, crop) in VARIANTS.items():
+            if crop:
+                image = ImageOps.fit(original, (width, height), Image.LANCZOS)
+            else:
+                image = original.copy()
+                image.thumbnail((width, height), Image.LANCZOS)
+            variants[name] = {
+                'jpeg': _save(image, f'variants/{name}/{stem}.jpg', 'JPEG', quality=JPEG_QUALITY,
+                              optimize=True, progressive=True),
+                'webp': _save(image, f'variants/{name}/{stem}.webp', 'WEBP', quality=WEBP_QUALITY, method=4),
+                'width': image.width,
+                'height': image.height,
+            }
+        variants['source'] = fieldfile.name
+
+        if has_placeholder(instance, field_name):
+            tiny = original.copy()
+            tiny.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+            buffer = BytesIO()
+            tiny.save(buffer, 'JPEG', quality=PLACEHOLDER_QUALITY)
+            details = {
+                f'{field_name}_width': original.width,
+                f'{field_name}_height': original.height,
+                f'{field_name}_placeholder': 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode(),
+            }
+    elif has_placeholder(instance, field_name):
+        details = {f'{field_name}_width': None, f'{field_name}_height': None, f'{field_name}_placeholder': ''}
+
+    details[variants_field(field_name)] = variants
+    rows = type(instance).objects.filter(pk=instance.pk)
+    if fieldfile:
+        rows = rows.filter(**{field_name: fieldfile.name})
+    if not rows.update(**details):
+        # Replaced (or deleted) while we were resizing; the job for the new
+        # image takes over
+        delete_files(variants)
+        return {}
+    for attname, value in details.items():
+        setattr(instance, attname, value)
+    delete_files(old)
+    return variants
+
+
+def _record_failure(instance, field_name, fieldfile, exc):
+    # Same guard as a successful build: only if the source is still current
+    failed = {'source': fieldfile.name, 'error': str(exc)[:200]}
+    updated = type(instance).objects.filter(pk=instance.pk, **{field_name: fieldfile.name}).update(
+        **{variants_field(field_name): failed}
+    )
+    setattr(instance, variants_field(field_name), failed)
+    return updated
+
+
+def _save(image, name, format, **options):
+    buffer = BytesIO()
+    image.save(buffer, format, **options)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def delete_files(variants):
+    for name in VARIANTS:
+        for key in ('jpeg', 'webp'):
+            path = (variants.get(name) or {}).get(key)
+            if path:
+                default_storage.delete(path)
@@ -0,0 +1,96 @@
+import re
+
+from django.db import transaction
+from django.db.models import Count, F, FloatField
+from django.db.models.functions import Cast, Greatest
+
+from .models import Ingredient, Recipe, RecipeIngredient
+
+# Ingredient inverted index. Free-text ingredient lines are reduced to
+# normalized tokens ("2 cups chopped Tomatoes" -> {"tomato"}) when a recipe
+# is saved, and stored as Ingredient -> RecipeIngredient posting lists.
+# "Cook with what I have" then counts, per recipe, how many of the pantry's
+# posting lists it appears in, which is |recipe ingredients ∩ pantry|.
+
+UNITS = {
+    'cup', 'cups', 'tbsp', 'tablespoon', 'tablespoons', 'tsp', 'teaspoon', 'teaspoons',
+    'g', 'gm', 'gram', 'grams', 'kg', 'mg', 'ml', 'l', 'litre', 'liter', 'litres', 'liters',
+    'oz', 'ounce', 'ounces', 'lb', 'lbs', 'pound', 'pounds', 'pinch', 'dash', 'clove', 'cloves',
+    'slice', 'slices', 'piece', 'pieces', 'can', 'cans', 'packet', 'bunch', 'handful', 'sprig',
+}
+
+STOPWORDS = {
+    'a', 'an', 'and', 'or', 'of', 'to', 'for', 'with', 'the', 'as', 'taste', 'optional',
+    'fresh', 'freshly', 'chopped', 'diced', 'sliced', 'minced', 'grated', 'ground', 'crushed',
+    'large', 'medium', 'small', 'whole', 'finely', 'roughly', 'thinly', 'boiled', 'cooked',
+    'peeled', 'some', 'few', 'about', 'more', 'needed', 'required', 'little', 'into',
+}
+
+PAGE_SIZE = 20
+
+
+def normalize(word):
+    # Lowercase singular form: "tomatoes" -> "tomato", "berries" -> "berry"
+    word = word.lower()
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith('oes'):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    tokens = set()
+    for line in (text or '').splitlines():
+        line = re.sub(r'\(.*?\)', ' ', line)
+        for word in re.findall(r'[^\W\d_]+', line.lower()):
+            if len(word) > 1 and word not in UNITS and word not in STOPWORDS:
+                tokens.add(normalize(word))
+    return tokens
+
+
+def ingredient_ids(tokens):
+    # Ingredient ids for `tokens`, creating the missing ones.
+    Ingredient.objects.bulk_create([Ingredient(name=token) for token in tokens], ignore_conflicts=True)
+    return list(Ingredient.objects.filter(name__in=tokens).values_list('id', flat=True))
+
+
+def index_recipe(recipe):
+    tokens = tokenize(recipe.ingredients)
+    with transaction.atomic():
+        RecipeIngredient.objects.filter(recipe=recipe).delete()
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(ingredient_id=ingredient_id, recipe_id=recipe.pk)
+            for ingredient_id in ingredient_ids(tokens)
+        ])
+        Recipe.objects.filter(pk=recipe.pk).update(ingredient_count=len(tokens))
+
+
+def rebuild_index(batch_size=500):
+    indexed = 0
+    for recipe in Recipe.objects.only('id', 'ingredients').iterator(chunk_size=batch_size):
+        index_recipe(recipe)
+        indexed += 1
+    return indexed
+
+
+def pantry_search(pantry, limit=PAGE_SIZE):
+    # Recipes ranked by how much of their ingredient list `pantry` covers.
+    # Returns [(recipe_id, matched, total)], best first. Counting, ranking
+    # and the limit all happen in one GROUP BY query.
+    ids = list(Ingredient.objects.filter(name__in=tokenize('\n'.join(pantry))).values_list('id', flat=True))
+    if not ids:
+        return []
+
+    ranked = (
+        RecipeIngredient.objects.filter(ingredient_id__in=ids)
+        .values('recipe_id')
+        .annotate(matched=Count('id'))
+        .annotate(total=Greatest(F('recipe__ingredient_count'), F('matched')))
+        .annotate(coverage=Cast('matched', FloatField()) / F('total'), missing=F('total') - F('matched'))
+        .order_by('-coverage', '-matched', 'missing', '-recipe_id')
+        .values_list('recipe_id', 'matched', 'total')
+    )
+    return list(ranked[:limit])
@@ -0,0 +1,75 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from myapp.models import CustomUser, Recipe
+from myapp.pagination import paginate
+
+Follow = CustomUser.followers.through
+
+
+class Command(BaseCommand):
+    help = (
+        "Time one explore page for a viewer following 10 to 10,000 accounts, "
+        "comparing the NOT EXISTS anti-join with the old author IN-list. "
+        "Synthetic data is created inside a transaction and rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--follows', type=int, nargs='+', default=[10, 100, 1000, 10000])
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['follows'])
+        with transaction.atomic():
+            viewer, authors = self.populate(max(sizes), options['recipes'])
+
+            self.stdout.write(f"{'follows':>8}  {'anti-join ms':>12}  {'IN-list ms':>10}")
+            for size in sizes:
+                Follow.objects.filter(to_customuser=viewer).delete()
+                Follow.objects.bulk_create(
+                    [Follow(from_customuser_id=author_id, to_customuser=viewer) for author_id in authors[:size]],
+                    batch_size=1000,
+                )
+                anti_join = self.time(lambda: Recipe.objects.for_cards(viewer).unfollowed_by(viewer), options['repeat'])
+                in_list = self.time(lambda: self.in_list_queryset(viewer), options['repeat'])
+                self.stdout.write(f"{size:>8}  {anti_join:>12.2f}  {in_list:>10.2f}")
+
+            transaction.set_rollback(True)
+
+    def populate(self, num_authors, num_recipes):
+        stamp = int(time.time())
+        viewer = CustomUser.objects.create(username=f'bench-viewer-{stamp}', user_type='user')
+        CustomUser.objects.bulk_create(
+            [CustomUser(username=f'bench-{stamp}-{i}', user_type='user') for i in range(num_authors * 2)],
+            batch_size=1000,
+        )
+        authors = list(
+            CustomUser.objects.filter(username__startswith=f'bench-{stamp}-').values_list('id', flat=True)
+        )
+        Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    title=f'Bench {i}', description='', ingredients='', instructions='',
+                    cook_time=10, servings=2, difficulty='easy', author_id=authors[i % len(authors)],
+                )
+                for i in range(num_recipes)
+            ],
+            batch_size=1000,
+        )
+        return viewer, authors
+
+    def in_list_queryset(self, viewer):
+        followed_user_ids = list(viewer.following.values_list('id', flat=True))
+        return Recipe.objects.for_cards(viewer).exclude(author__id__in=followed_user_ids + [viewer.id])
+
+    def time(self, make_queryset, repeat):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            paginate(make_queryset(), None)
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
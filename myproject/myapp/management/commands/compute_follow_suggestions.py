@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from myapp.models import CustomUser, FollowSuggestion
+
+Follow = CustomUser.followers.through
+
+
+class Command(BaseCommand):
+    help = "Precompute friends-of-friends follow suggestions for every user."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=10, help="Suggestions stored per user.")
+
+    def handle(self, *args, **options):
+        batch_size, limit = options['batch_size'], options['limit']
+
+        # Fallback for users with no second-degree candidates (e.g. new users)
+        popular = list(
+            CustomUser.objects.filter(is_active=True).order_by('-num_followers', 'id')
+            .values_list('id', flat=True)[:limit * 5]
+        )
+
+        processed = 0
+        last_id = 0
+        while True:
+            user_ids = list(
+                CustomUser.objects.filter(id__gt=last_id, is_active=True).order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+
+            suggestions = []
+            for user_id in user_ids:
+                suggestions += self.suggestions_for(user_id, popular, limit)
+
+            with transaction.atomic():
+                FollowSuggestion.objects.filter(user_id__in=user_ids).delete()
+                FollowSuggestion.objects.bulk_create(suggestions)
+            processed += len(user_ids)
+
+        self.stdout.write(self.style.SUCCESS(f"Computed suggestions for {processed} user(s)."))
+
+    def suggestions_for(self, user_id, popular, limit):
+        # Follow rows are (from=followed, to=follower).
+        following = Follow.objects.filter(to_customuser_id=user_id).values('from_customuser_id')
+        ranked = (
+            Follow.objects.filter(to_customuser_id__in=following)
+            .exclude(from_customuser_id=user_id)
+            .exclude(from_customuser_id__in=following)
+            .values('from_customuser_id')
+            .annotate(mutual=Count('to_customuser_id'))
+            .order_by('-mutual', 'from_customuser_id')
+            .values_list('from_customuser_id', 'mutual')[:limit]
+        )
+        candidates = dict(ranked)
+
+        if len(candidates) < limit:
+            already = set(following.values_list('from_customuser_id', flat=True)) | {user_id}
+            for candidate_id in popular:
+                if len(candidates) >= limit:
+                    break
+                if candidate_id not in already:
+                    candidates.setdefault(candidate_id, 0)
+
+        return [
+            FollowSuggestion(user_id=user_id, suggested_user_id=candidate_id, mutual_count=mutual)
+            for candidate_id, mutual in candidates.items()
+        ]
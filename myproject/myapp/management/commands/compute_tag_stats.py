@@ -0,0 +1,57 @@
+from collections import Counter, defaultdict
+from itertools import combinations, groupby
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from myapp.models import AutocompleteEntry, Recipe, Tag, TagCooccurrence
+
+RecipeTag = Recipe.tags.through
+
+
+class Command(BaseCommand):
+    help = "Precompute per-tag recipe counts and the tag co-occurrence table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help="Related tags stored per tag.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        # One pass over recipe_tags in recipe order: every recipe contributes
+        # its tags to the counts and each pair of its tags to co-occurrence.
+        recipe_counts = Counter()
+        pairs = defaultdict(Counter)
+        rows = RecipeTag.objects.order_by('recipe_id').values_list('recipe_id', 'tag_id').iterator(chunk_size=batch_size)
+        for _, group in groupby(rows, key=lambda row: row[0]):
+            tag_ids = sorted({tag_id for _, tag_id in group})
+            recipe_counts.update(tag_ids)
+            for a, b in combinations(tag_ids, 2):
+                pairs[a][b] += 1
+                pairs[b][a] += 1
+
+        cooccurrences = [
+            TagCooccurrence(tag_id=tag_id, related_tag_id=related_id, count=count)
+            for tag_id, related in pairs.items()
+            for related_id, count in related.most_common(options['top'])
+        ]
+
+        tags = list(Tag.objects.only('id', 'recipe_count'))
+        for tag in tags:
+            tag.recipe_count = recipe_counts.get(tag.id, 0)
+
+        # Tag autocomplete ranks by the same popularity
+        entries = list(AutocompleteEntry.objects.filter(kind='tag').only('id', 'object_id', 'weight'))
+        for entry in entries:
+            entry.weight = recipe_counts.get(entry.object_id, 0)
+
+        with transaction.atomic():
+            Tag.objects.bulk_update(tags, ['recipe_count'], batch_size=batch_size)
+            AutocompleteEntry.objects.bulk_update(entries, ['weight'], batch_size=batch_size)
+            TagCooccurrence.objects.all().delete()
+            TagCooccurrence.objects.bulk_create(cooccurrences, batch_size=batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Counted {len(tags)} tag(s); stored {len(cooccurrences)} related-tag pair(s)."
+        ))
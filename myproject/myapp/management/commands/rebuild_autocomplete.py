@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from myapp import autocomplete
+
+
+class Command(BaseCommand):
+    help = "Rebuild the user/tag autocomplete index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        entries = autocomplete.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {entries} autocomplete term(s)."))
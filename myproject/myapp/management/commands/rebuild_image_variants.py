@@ -0,0 +1,30 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from myapp import images
+
+
+class Command(BaseCommand):
+    help = "Build missing or stale image variants (thumb/card/full, JPEG + WebP) for existing uploads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--force', action='store_true', help="Rebuild variants that are already current.")
+
+    def handle(self, *args, **options):
+        built = failed = 0
+        for label, field_names in images.IMAGE_FIELDS.items():
+            model = apps.get_model(label)
+            for field_name in field_names:
+                queryset = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                for instance in queryset.iterator(chunk_size=options['batch_size']):
+                    if not options['force'] and not images.needs_variants(instance, field_name):
+                        continue
+                    try:
+                        images.build_variants(instance, field_name)
+                        built += 1
+                    except images.DECODE_ERRORS as exc:
+                        failed += 1
+                        self.stderr.write(f"{label} #{instance.pk} {field_name}: {exc}")
+
+        self.stdout.write(self.style.SUCCESS(f"Built variants for {built} image(s); {failed} failed."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from myapp import ingredients
+
+
+class Command(BaseCommand):
+    help = "Re-tokenize every recipe's ingredients into the ingredient inverted index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        indexed = ingredients.rebuild_index(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed ingredients of {indexed} recipe(s)."))
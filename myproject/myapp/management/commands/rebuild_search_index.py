@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text recipe search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError("Full-text search needs SQLite FTS5; other databases use the icontains fallback.")
+        indexed = search.rebuild_index(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} recipe(s)."))
@@ -0,0 +1,40 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from myapp import trending
+from myapp.models import Like, Recipe
+
+
+class Command(BaseCommand):
+    help = "Recompute Recipe.trending_score from likes and refresh the cached top list."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        updated = 0
+        last_id = 0
+
+        while True:
+            batch = list(
+                Recipe.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'created_at', 'trending_score')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            like_times = defaultdict(list)
+            likes = Like.objects.filter(recipe_id__in=[recipe.id for recipe in batch])
+            for recipe_id, created_at in likes.values_list('recipe_id', 'created_at').iterator():
+                like_times[recipe_id].append(created_at)
+
+            for recipe in batch:
+                recipe.trending_score = trending.compute_score(recipe.created_at, like_times[recipe.id])
+            Recipe.objects.bulk_update(batch, ['trending_score'])
+            updated += len(batch)
+
+        trending.refresh_top()
+        self.stdout.write(self.style.SUCCESS(f"Rescored {updated} recipe(s)."))
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from myapp.models import CustomUser
+
+Follow = CustomUser.followers.through
+
+
+class Command(BaseCommand):
+    help = "Recompute CustomUser.num_followers / num_following and report drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without fixing it.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        checked = drifted = 0
+        last_id = 0
+
+        while True:
+            batch = list(
+                CustomUser.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'num_followers', 'num_following')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+            ids = [user.id for user in batch]
+
+            followers = self.counts(ids, 'from_customuser_id')
+            following = self.counts(ids, 'to_customuser_id')
+            stale = []
+            for user in batch:
+                actual = (followers.get(user.id, 0), following.get(user.id, 0))
+                if (user.num_followers, user.num_following) != actual:
+                    user.num_followers, user.num_following = actual
+                    stale.append(user)
+
+            if stale and not options['dry_run']:
+                CustomUser.objects.bulk_update(stale, ['num_followers', 'num_following'])
+            checked += len(batch)
+            drifted += len(stale)
+
+        verb = "would fix" if options['dry_run'] else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} user(s); {verb} {drifted} with drift."))
+
+    def counts(self, ids, column):
+        return dict(
+            Follow.objects.filter(**{f'{column}__in': ids})
+            .values(column).annotate(n=Count('*')).values_list(column, 'n')
+        )
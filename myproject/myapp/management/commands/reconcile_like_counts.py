@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from myapp.models import Like, Recipe
+
+
+class Command(BaseCommand):
+    help = "Recompute Recipe.like_count from the Like table and report drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without fixing it.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        checked = drifted = total_drift = 0
+        last_id = 0
+
+        while True:
+            batch = list(
+                Recipe.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'like_count')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            actual = dict(
+                Like.objects.filter(recipe_id__in=[recipe.id for recipe in batch])
+                .values('recipe_id').annotate(n=Count('*')).values_list('recipe_id', 'n')
+            )
+            stale = []
+            for recipe in batch:
+                count = actual.get(recipe.id, 0)
+                if recipe.like_count != count:
+                    total_drift += abs(recipe.like_count - count)
+                    recipe.like_count = count
+                    stale.append(recipe)
+
+            if stale and not options['dry_run']:
+                Recipe.objects.bulk_update(stale, ['like_count'])
+            checked += len(batch)
+            drifted += len(stale)
+
+        verb = "would fix" if options['dry_run'] else "fixed"
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} recipe(s); {verb} {drifted} with drift (total off by {total_drift})."
+        ))
@@ -0,0 +1,54 @@
+from collections import Counter
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from myapp import images
+from myapp.models import MediaBlob
+
+
+class Command(BaseCommand):
+    help = "Recount MediaBlob references from the image fields and delete unreferenced blobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without fixing it.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        refs = Counter()
+        for label, field_names in images.IMAGE_FIELDS.items():
+            model = apps.get_model(label)
+            columns = [column for name in field_names for column in (name, images.variants_field(name))]
+            for row in model.objects.values_list(*columns).iterator(chunk_size=batch_size):
+                for name, variants in zip(row[::2], row[1::2]):
+                    if name:
+                        refs[name] += 1
+                    for variant in images.VARIANTS:
+                        for key in ('jpeg', 'webp'):
+                            path = ((variants or {}).get(variant) or {}).get(key)
+                            if path:
+                                refs[path] += 1
+
+        drifted, orphans = [], []
+        for blob in MediaBlob.objects.order_by('id').iterator(chunk_size=batch_size):
+            count = refs.get(blob.name, 0)
+            if count == 0:
+                orphans.append(blob)
+            elif blob.ref_count != count:
+                blob.ref_count = count
+                drifted.append(blob)
+
+        if not options['dry_run']:
+            MediaBlob.objects.bulk_update(drifted, ['ref_count'], batch_size=batch_size)
+            for blob in orphans:
+                blob.delete()
+                default_storage.delete(blob.name)  # no row left, so this removes the file
+
+        verb = "would fix" if options['dry_run'] else "fixed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb.capitalize()} {len(drifted)} blob count(s); "
+            f"{'would delete' if options['dry_run'] else 'deleted'} {len(orphans)} unreferenced blob(s)."
+        ))
@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from myapp import realtime, tasks
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (likes/follows notifications, timeline fan-out, ...)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll', type=float, default=1.0, help="Seconds to wait when no job is ready.")
+        parser.add_argument('--burst', action='store_true', help="Exit once the queue has no ready jobs.")
+
+    def handle(self, *args, **options):
+        # One thread per concurrency slot; `running` enforces each task's limit
+        running = Counter()
+        results = Counter()
+        lock = threading.Lock()
+
+        def work(job):
+            close_old_connections()
+            try:
+                return tasks.run(job)
+            finally:
+                close_old_connections()
+
+        def finished(name, future):
+            with lock:
+                running[name] -= 1
+                results['done' if future.result() else 'failed'] += 1
+
+        threads = sum(spec.concurrency for spec in tasks.registry.values())
+        next_prune = 0
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='job') as pool:
+            try:
+                while True:
+                    tasks.requeue_stale()
+                    if time.monotonic() >= next_prune:
+                        realtime.prune_events()
+                        next_prune = time.monotonic() + realtime.PRUNE_SECONDS
+                    submitted = 0
+                    for name, spec in tasks.registry.items():
+                        with lock:
+                            free = spec.concurrency - running[name]
+                        if free <= 0:
+                            continue
+                        for job in tasks.claim(name, free):
+                            with lock:
+                                running[name] += 1
+                            pool.submit(work, job).add_done_callback(
+                                lambda future, name=name: finished(name, future)
+                            )
+                            submitted += 1
+
+                    if not submitted:
+                        with lock:
+                            idle = not +running
+                        if options['burst'] and idle:
+                            break
+                        time.sleep(options['poll'])
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping; waiting for running jobs to finish...")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Ran {results['done'] + results['failed']} job(s): {results['done']} succeeded, "
+            f"{results['failed']} failed or will be retried."
+        ))
@@ -0,0 +1,134 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from .storage import BLOB_PREFIX
+
+# Serving of MEDIA_ROOT (see views.serve_media). Answers conditional
+# requests (ETag / Last-Modified -> 304) and single byte ranges (206), and
+# with settings.MEDIA_SENDFILE set hands the transfer to the front-end
+# server instead of copying bytes through Python:
+#
+#   MEDIA_SENDFILE = 'x-accel-redirect'  # nginx, with an internal location
+#                                        # at MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT
+#   MEDIA_SENDFILE = 'x-sendfile'        # Apache mod_xsendfile, lighttpd
+
+# Content-addressed blobs never change under their name
+BLOB_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+FILE_CACHE_CONTROL = 'public, max-age=3600'
+
+CHUNK_SIZE = 64 * 1024
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def etag(name, stat):
+    # Blobs are named after their digest; other files use mtime + size
+    if name.startswith(BLOB_PREFIX):
+        return quote_etag(os.path.splitext(os.path.basename(name))[0])
+    return quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+
+
+def parse_range(header, size):
+    # (start, end) inclusive for a single satisfiable range, None to send the
+    # whole file (no/unsupported header), or False if it is unsatisfiable.
+    match = _RANGE.match(header.replace(' ', ''))
+    if not match:
+        return None  # includes multi-range requests: reply 200 with everything
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if not length:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def if_range_matches(request, tag, mtime):
+    value = request.headers.get('If-Range')
+    if not value:
+        return True
+    if value.startswith(('"', 'W/')):
+        return value == tag  # strong comparison
+    modified = parse_http_date_safe(value)
+    return modified is not None and int(mtime) <= modified
+
+
+def serve(request, name):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    tag = etag(name, stat)
+    headers = HttpResponse()
+    headers['ETag'] = tag
+    headers['Last-Modified'] = http_date(stat.st_mtime)
+    headers['Cache-Control'] = BLOB_CACHE_CONTROL if name.startswith(BLOB_PREFIX) else FILE_CACHE_CONTROL
+    headers['Accept-Ranges'] = 'bytes'
+    conditional = get_conditional_response(request, etag=tag, last_modified=int(stat.st_mtime), response=headers)
+    if conditional is not headers:
+        return conditional  # 304 Not Modified / 412 Precondition Failed
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    offload = getattr(settings, 'MEDIA_SENDFILE', None)
+    if offload:
+        # The front-end server sends the bytes (and handles Range itself)
+        response = HttpResponse(content_type=content_type)
+        if offload == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/') + name
+        else:
+            response['X-Sendfile'] = full_path
+    else:
+        byte_range = parse_range(request.headers.get('Range', ''), stat.st_size)
+        if byte_range is not None and not if_range_matches(request, tag, stat.st_mtime):
+            byte_range = None
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+        elif byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(_read(full_path, start, end - start + 1), status=206,
+                                             content_type=content_type)
+            response['Content-Length'] = end - start + 1
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        else:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+    for header in ('ETag', 'Last-Modified', 'Cache-Control', 'Accept-Ranges'):
+        response[header] = headers[header]
+    return response
+
+
+def _read(path, offset, length):
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
@@ -0,0 +1,41 @@
+from django.db import transaction
+from django.db.models import F
+
+from .counters import unread_messages
+from .models import Conversation, Message
+
+
+def send_message(sender, recipient, message='', recipe=None):
+    # Create a Message and fold it into both participants' Conversation rows.
+    with transaction.atomic():
+        msg = Message.objects.create(sender=sender, recipient=recipient, message=message, recipe=recipe)
+        _touch(sender, recipient, msg, unread=0)
+        if recipient != sender:
+            _touch(recipient, sender, msg, unread=1)
+            transaction.on_commit(lambda: unread_messages.incr(recipient.id))
+    return msg
+
+
+def mark_conversation_read(user, other_user):
+    # Mark everything `other_user` sent to `user` as read.
+    updated = Message.objects.filter(sender=other_user, recipient=user, is_read=False).update(is_read=True)
+    Conversation.objects.filter(user=user, other_user=other_user).update(unread_count=0)
+    if updated:
+        # Recount rather than decr: the shared cache's incr/decr is a
+        # read-modify-write, and a lost decrement would show read messages
+        # as unread until the key expires
+        transaction.on_commit(lambda: unread_messages.reset(user.id))
+    return updated
+
+
+def _touch(user, other_user, msg, unread):
+    updated = Conversation.objects.filter(user=user, other_user=other_user).update(
+        last_message=msg,
+        last_message_at=msg.timestamp,
+        unread_count=F('unread_count') + unread,
+    )
+    if not updated:
+        Conversation.objects.create(
+            user=user, other_user=other_user, last_message=msg,
+            last_message_at=msg.timestamp, unread_count=unread,
+        )
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Frozen copies of timeline.BACKFILL_LIMIT / BATCH_SIZE
+BACKFILL_LIMIT = 100
+BATCH_SIZE = 500
+READER_BATCH = 50
+
+
+def backfill_feed_entries(apps, schema_editor):
+    # Every reader gets the latest BACKFILL_LIMIT recipes of each author they
+    # follow, and of their own, like timeline.backfill_author. Authors and
+    # their followers are read in keyset batches so memory stays flat.
+    CustomUser = apps.get_model('myapp', 'CustomUser')
+    Recipe = apps.get_model('myapp', 'Recipe')
+    FeedEntry = apps.get_model('myapp', 'FeedEntry')
+    Follow = CustomUser.followers.through
+
+    authors = Recipe.objects.order_by('author_id').values_list('author_id', flat=True).distinct()
+    last_author_id = 0
+    while True:
+        author_ids = list(authors.filter(author_id__gt=last_author_id)[:BATCH_SIZE])
+        if not author_ids:
+            break
+        for author_id in author_ids:
+            recipes = list(
+                Recipe.objects.filter(author_id=author_id)
+                .order_by('-created_at', '-id')
+                .values_list('id', 'created_at')[:BACKFILL_LIMIT]
+            )
+            readers = (
+                Follow.objects.filter(from_customuser_id=author_id)
+                .order_by('to_customuser_id')
+                .values_list('to_customuser_id', flat=True)
+            )
+            _add_entries(FeedEntry, [author_id], author_id, recipes)
+            last_reader_id = 0
+            while True:
+                reader_ids = list(readers.filter(to_customuser_id__gt=last_reader_id)[:READER_BATCH])
+                if not reader_ids:
+                    break
+                _add_entries(FeedEntry, reader_ids, author_id, recipes)
+                last_reader_id = reader_ids[-1]
+        last_author_id = author_ids[-1]
+
+
+def _add_entries(FeedEntry, reader_ids, author_id, recipes):
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, recipe_id=recipe_id, author_id=author_id, created_at=created_at)
+            for user_id in reader_ids
+            for recipe_id, created_at in recipes
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0012_customuser_contact_number_customuser_opening_hours'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='myapp.recipe')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-recipe'],
+                'indexes': [models.Index(fields=['user', '-created_at', '-recipe'], name='feedentry_user_created_idx'), models.Index(fields=['user', 'author'], name='feedentry_user_author_idx')],
+                'unique_together': {('user', 'recipe')},
+            },
+        ),
+        migrations.RunPython(backfill_feed_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:23
+
+import math
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+
+# Frozen copy of myapp.trending.compute_score at the time of this migration.
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+HALF_LIFE_SECONDS = 24 * 3600
+
+
+def score(created_at, like_times):
+    exponents = [(t - EPOCH).total_seconds() / HALF_LIFE_SECONDS for t in [created_at, *like_times]]
+    top = max(exponents)
+    return top + math.log2(sum(2 ** (x - top) for x in exponents))
+
+
+def backfill_trending_scores(apps, schema_editor):
+    Recipe = apps.get_model('myapp', 'Recipe')
+    Like = apps.get_model('myapp', 'Like')
+
+    like_times = {}
+    for recipe_id, created_at in Like.objects.values_list('recipe_id', 'created_at').iterator():
+        like_times.setdefault(recipe_id, []).append(created_at)
+
+    recipes = list(Recipe.objects.only('id', 'created_at'))
+    for recipe in recipes:
+        recipe.trending_score = score(recipe.created_at, like_times.get(recipe.id, []))
+    Recipe.objects.bulk_update(recipes, ['trending_score'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0016_customuser_follow_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='trending_score',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.RunPython(backfill_trending_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS myapp_recipe_fts USING fts5("
+        "title, description, ingredients, tags, tokenize = 'porter unicode61')"
+    )
+
+    Recipe = apps.get_model('myapp', 'Recipe')
+    for recipe in Recipe.objects.prefetch_related('tags').iterator(chunk_size=500):
+        schema_editor.execute(
+            "INSERT INTO myapp_recipe_fts (rowid, title, description, ingredients, tags) VALUES (%s, %s, %s, %s, %s)",
+            [recipe.pk, recipe.title, recipe.description, recipe.ingredients,
+             ' '.join(tag.name for tag in recipe.tags.all())],
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS myapp_recipe_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0018_followsuggestion'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
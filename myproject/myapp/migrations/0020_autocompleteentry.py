@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:26
+
+from django.db import migrations, models
+
+
+def normalize(text):
+    return ' '.join((text or '').lower().split())
+
+
+def backfill_autocomplete(apps, schema_editor):
+    # Frozen copy of myapp.autocomplete.rebuild at the time of this migration.
+    CustomUser = apps.get_model('myapp', 'CustomUser')
+    Tag = apps.get_model('myapp', 'Tag')
+    AutocompleteEntry = apps.get_model('myapp', 'AutocompleteEntry')
+
+    entries = []
+    for user in CustomUser.objects.iterator(chunk_size=1000):
+        full_name = f'{user.first_name} {user.last_name}'
+        terms = set()
+        for name in (user.username, user.first_name, user.last_name, full_name, user.restaurant_name):
+            name = normalize(name)
+            if name:
+                terms.add(name)
+                terms.update(name.split())
+        entries += [
+            AutocompleteEntry(kind='user', object_id=user.pk, term=term[:255],
+                              label=user.username, weight=user.num_followers)
+            for term in terms
+        ]
+    for tag in Tag.objects.iterator(chunk_size=1000):
+        entries.append(AutocompleteEntry(kind='tag', object_id=tag.pk, term=normalize(tag.name), label=tag.name))
+    AutocompleteEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0019_recipe_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutocompleteEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'User'), ('tag', 'Tag')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('term', models.CharField(max_length=255)),
+                ('label', models.CharField(max_length=255)),
+                ('weight', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'term'], name='autocomplete_term_idx'), models.Index(fields=['kind', 'object_id'], name='autocomplete_object_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_autocomplete, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:28
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of the tokenizer in myapp/ingredients.py at the time of this
+# migration.
+
+UNITS = {
+    'cup', 'cups', 'tbsp', 'tablespoon', 'tablespoons', 'tsp', 'teaspoon', 'teaspoons',
+    'g', 'gm', 'gram', 'grams', 'kg', 'mg', 'ml', 'l', 'litre', 'liter', 'litres', 'liters',
+    'oz', 'ounce', 'ounces', 'lb', 'lbs', 'pound', 'pounds', 'pinch', 'dash', 'clove', 'cloves',
+    'slice', 'slices', 'piece', 'pieces', 'can', 'cans', 'packet', 'bunch', 'handful', 'sprig',
+}
+
+STOPWORDS = {
+    'a', 'an', 'and', 'or', 'of', 'to', 'for', 'with', 'the', 'as', 'taste', 'optional',
+    'fresh', 'freshly', 'chopped', 'diced', 'sliced', 'minced', 'grated', 'ground', 'crushed',
+    'large', 'medium', 'small', 'whole', 'finely', 'roughly', 'thinly', 'boiled', 'cooked',
+    'peeled', 'some', 'few', 'about', 'more', 'needed', 'required', 'little', 'into',
+}
+
+
+def normalize(word):
+    word = word.lower()
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith('oes'):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    tokens = set()
+    for line in (text or '').splitlines():
+        line = re.sub(r'\(.*?\)', ' ', line)
+        for word in re.findall(r'[^\W\d_]+', line.lower()):
+            if len(word) > 1 and word not in UNITS and word not in STOPWORDS:
+                tokens.add(normalize(word))
+    return tokens
+
+
+def backfill_ingredient_index(apps, schema_editor):
+    # Index the existing catalogue, BATCH_SIZE recipes at a time.
+    Recipe = apps.get_model('myapp', 'Recipe')
+    Ingredient = apps.get_model('myapp', 'Ingredient')
+    RecipeIngredient = apps.get_model('myapp', 'RecipeIngredient')
+
+    batch_size = 500
+    last_id = 0
+    while True:
+        recipes = list(Recipe.objects.filter(id__gt=last_id).order_by('id').only('id', 'ingredients')[:batch_size])
+        if not recipes:
+            break
+        tokens = {recipe.id: tokenize(recipe.ingredients) for recipe in recipes}
+        names = set().union(*tokens.values())
+        Ingredient.objects.bulk_create([Ingredient(name=name) for name in names], ignore_conflicts=True)
+        ids = dict(Ingredient.objects.filter(name__in=names).values_list('name', 'id'))
+        RecipeIngredient.objects.bulk_create(
+            [RecipeIngredient(recipe_id=recipe_id, ingredient_id=ids[name])
+             for recipe_id, words in tokens.items() for name in words],
+            batch_size=batch_size,
+        )
+        for recipe_id, words in tokens.items():
+            Recipe.objects.filter(pk=recipe_id).update(ingredient_count=len(words))
+        last_id = recipes[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0020_autocompleteentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ingredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='RecipeIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='myapp.ingredient')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingredient_postings', to='myapp.recipe')),
+            ],
+            options={
+                'unique_together': {('ingredient', 'recipe')},
+            },
+        ),
+        migrations.RunPython(backfill_ingredient_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_recipe_counts(apps, schema_editor):
+    Tag = apps.get_model('myapp', 'Tag')
+    RecipeTag = apps.get_model('myapp', 'Recipe').tags.through
+    counts = RecipeTag.objects.filter(tag=OuterRef('pk')).values('tag').annotate(n=Count('*')).values('n')
+    Tag.objects.update(recipe_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0021_ingredient_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='TagCooccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField()),
+                ('related_tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='myapp.tag')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_tags', to='myapp.tag')),
+            ],
+            options={
+                'ordering': ['-count', 'id'],
+                'indexes': [models.Index(fields=['tag', '-count'], name='tagcooccurrence_tag_idx')],
+                'unique_together': {('tag', 'related_tag')},
+            },
+        ),
+        migrations.RunPython(backfill_recipe_counts, migrations.RunPython.noop),
+    ]
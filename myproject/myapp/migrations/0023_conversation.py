@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_conversations(apps, schema_editor):
+    Message = apps.get_model('myapp', 'Message')
+    Conversation = apps.get_model('myapp', 'Conversation')
+
+    threads = {}
+    for message in Message.objects.order_by('timestamp', 'id').iterator():
+        sides = [(message.sender_id, message.recipient_id, False), (message.recipient_id, message.sender_id, True)]
+        for user_id, other_id, incoming in sides[:1 if message.sender_id == message.recipient_id else 2]:
+            thread = threads.setdefault((user_id, other_id), Conversation(
+                user_id=user_id, other_user_id=other_id, unread_count=0,
+            ))
+            thread.last_message_id = message.id
+            thread.last_message_at = message.timestamp
+            if incoming and not message.is_read:
+                thread.unread_count += 1
+    Conversation.objects.bulk_create(threads.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0022_tag_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_at', models.DateTimeField()),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='myapp.message')),
+                ('other_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-last_message_at', '-id'],
+                'indexes': [models.Index(fields=['user', '-last_message_at', '-id'], name='conversation_inbox_idx')],
+                'unique_together': {('user', 'other_user')},
+            },
+        ),
+        migrations.RunPython(backfill_conversations, migrations.RunPython.noop),
+    ]
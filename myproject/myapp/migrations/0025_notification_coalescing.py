@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:34
+
+from itertools import groupby
+
+from django.db import migrations, models
+
+RECENT_ACTORS = 3
+
+
+def display_name(user):
+    # Frozen copy of CustomUser.get_display_name
+    if user.user_type == 'restaurant' and user.restaurant_name:
+        return user.restaurant_name
+    return f'{user.first_name} {user.last_name}'.strip() or user.username
+
+
+def coalesce_unread_likes(apps, schema_editor):
+    # Fold each author's pile of unread like notifications for a recipe into
+    # its newest row, the same shape myapp/notifications.py now produces.
+    Notification = apps.get_model('myapp', 'Notification')
+
+    rows = (
+        Notification.objects.filter(notification_type='like', is_read=False, recipe__isnull=False)
+        .select_related('from_user', 'recipe')
+        .order_by('to_user_id', 'recipe_id', '-timestamp', '-id')
+        .iterator()
+    )
+    for _, group in groupby(rows, key=lambda row: (row.to_user_id, row.recipe_id)):
+        group = list(group)
+        actors, seen = [], set()
+        for row in group:
+            if row.from_user_id and row.from_user_id not in seen and len(actors) < RECENT_ACTORS:
+                seen.add(row.from_user_id)
+                actors.append({'id': row.from_user_id, 'name': display_name(row.from_user)})
+
+        keep = group[0]
+        keep.actor_count = len(group)
+        keep.recent_actors = actors
+        if len(group) > 1:
+            name = actors[0]['name'] if actors else 'Someone'
+            others = len(group) - 1
+            keep.message = (
+                f"{name} and {others:,} other{'s' if others > 1 else ''} liked your recipe '{keep.recipe.title}'."
+            )
+            Notification.objects.filter(pk__in=[row.pk for row in group[1:]]).delete()
+        keep.save(update_fields=['actor_count', 'recent_actors', 'message'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0024_message_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actor_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='recent_actors',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['to_user', 'recipe', 'notification_type', 'is_read'], name='notification_group_idx'),
+        ),
+        migrations.RunPython(coalesce_unread_likes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:37
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_notifications(apps, schema_editor):
+    CustomUser = apps.get_model('myapp', 'CustomUser')
+    Notification = apps.get_model('myapp', 'Notification')
+
+    CustomUser.objects.update(num_unread_notifications=Coalesce(Subquery(
+        Notification.objects.filter(to_user=OuterRef('pk'), is_read=False)
+        .values('to_user').annotate(n=Count('*')).values('n')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0026_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='num_unread_notifications',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['to_user', '-timestamp', '-id'], name='notification_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['to_user', 'is_read', '-timestamp'], name='notification_unread_idx'),
+        ),
+        migrations.RunPython(backfill_unread_notifications, migrations.RunPython.noop),
+    ]
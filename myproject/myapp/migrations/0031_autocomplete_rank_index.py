@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0030_image_placeholders'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='autocompleteentry',
+            name='autocomplete_term_idx',
+        ),
+        migrations.AddIndex(
+            model_name='autocompleteentry',
+            index=models.Index(fields=['kind', 'term', 'weight'], name='autocomplete_rank_idx'),
+        ),
+    ]
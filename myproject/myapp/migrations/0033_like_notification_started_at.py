@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:00
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def backfill_started_at(apps, schema_editor):
+    # Open like notifications start at the earliest current like among their
+    # recent actors, or at their own timestamp when there is none.
+    Notification = apps.get_model('myapp', 'Notification')
+    Like = apps.get_model('myapp', 'Like')
+
+    rows = Notification.objects.filter(notification_type='like', is_read=False, recipe__isnull=False)
+    for row in rows.iterator():
+        actor_ids = [actor['id'] for actor in row.recent_actors]
+        first_like = Like.objects.filter(recipe_id=row.recipe_id, user_id__in=actor_ids).aggregate(
+            first=Min('created_at'))['first']
+        row.started_at = min(first_like, row.timestamp) if first_like else row.timestamp
+        row.save(update_fields=['started_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0032_realtimeevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['recipe', 'created_at'], name='like_recipe_time_idx'),
+        ),
+        migrations.RunPython(backfill_started_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:46
+
+import myapp.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0034_cache_table'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='autocompleteentry',
+            index=models.Index(models.F('kind'), myapp.models.TermHead('term', 1), models.F('weight'), name='autocomplete_head1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='autocompleteentry',
+            index=models.Index(models.F('kind'), myapp.models.TermHead('term', 2), models.F('weight'), name='autocomplete_head2_idx'),
+        ),
+    ]
@@ -1,8 +1,11 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils import timezone
+from django.db.models import BooleanField, Exists, Func, OuterRef, Subquery, Value
 
 class CustomUser(AbstractUser):
     USER_TYPE_CHOICES = [
@@ -12,6 +15,8 @@ class CustomUser(AbstractUser):
 
     user_type = models.CharField(max_length=20, choices=USER_TYPE_CHOICES)
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    # Resized copies, built in the background (see myapp/images.py)
+    profile_picture_variants = models.JSONField(default=dict, blank=True)
     bio = models.TextField(blank=True, null=True)
 
     restaurant_name = models.CharField(max_length=255, blank=True, null=True)
@@ -27,6 +32,15 @@ class CustomUser(AbstractUser):
         blank=True
     )
 
+    # Denormalized sizes of `followers` / `following`, kept in step by
+    # follow() and unfollow().
+    num_followers = models.PositiveIntegerField(default=0)
+    num_following = models.PositiveIntegerField(default=0)
+
+    # Unread notifications, kept in step by signals.py and
+    # notifications.mark_read(); drives the bell badge.
+    num_unread_notifications = models.PositiveIntegerField(default=0)
+
     def is_restaurant(self):
         return self.user_type == 'restaurant'
 
@@ -40,17 +54,84 @@ class CustomUser(AbstractUser):
         return self.get_display_name()
     
     def follower_count(self):
-        return self.followers.count()
+        return self.num_followers
 
     def following_count(self):
-        return self.following.count()
-
+        return self.num_following
+
+    def is_followed_by(self, user):
+        # Single indexed probe on the follow table instead of loading the
+        # whole follower list.
+        return self.followers.filter(pk=user.pk).exists()
+
+    def follow(self, user):
+        # Start following `user`. Returns False if already following.
+        Follow = CustomUser.followers.through
+        with transaction.atomic():
+            _, created = Follow.objects.get_or_create(from_customuser=user, to_customuser=self)
+            if created:
+                CustomUser.objects.filter(pk=user.pk).update(num_followers=F('num_followers') + 1)
+                CustomUser.objects.filter(pk=self.pk).update(num_following=F('num_following') + 1)
+                AutocompleteEntry.reweight_user(user.pk)
+        return created
+
+    def unfollow(self, user):
+        # Stop following `user`. Returns False if not following.
+        Follow = CustomUser.followers.through
+        with transaction.atomic():
+            deleted, _ = Follow.objects.filter(from_customuser=user, to_customuser=self).delete()
+            if deleted:
+                CustomUser.objects.filter(pk=user.pk, num_followers__gt=0).update(num_followers=F('num_followers') - 1)
+                CustomUser.objects.filter(pk=self.pk, num_following__gt=0).update(num_following=F('num_following') - 1)
+                AutocompleteEntry.reweight_user(user.pk)
+        return bool(deleted)
 
 
 User = get_user_model()
 
 
+class FollowSuggestion(models.Model):
+    # Precomputed "people you may know", rebuilt by
+    # `manage.py compute_follow_suggestions`.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='follow_suggestions')
+    suggested_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    mutual_count = models.PositiveIntegerField(default=0)  # followed accounts that follow them
+
+    class Meta:
+        ordering = ['-mutual_count', 'id']
+        unique_together = ('user', 'suggested_user')
+        indexes = [
+            models.Index(fields=['user', '-mutual_count'], name='followsuggestion_user_idx'),
+        ]
 
+    def __str__(self):
+        return f'Suggest {self.suggested_user.username} to {self.user.username}'
+
+
+class RecipeQuerySet(models.QuerySet):
+    def with_like_state(self, viewer):
+        # "Has the viewer liked it" for every recipe in one query, instead of
+        # `user in recipe.likes.all` per card. Counts come from the stored
+        # like_count column.
+        if viewer is not None and viewer.is_authenticated:
+            viewer_has_liked = Exists(Like.objects.filter(recipe=OuterRef('pk'), user=viewer))
+        else:
+            viewer_has_liked = Value(False, output_field=BooleanField())
+        return self.annotate(viewer_has_liked=viewer_has_liked)
+
+    def unfollowed_by(self, viewer):
+        # Recipes by authors the viewer doesn't follow (and not their own).
+        # A correlated NOT EXISTS against the follow table, so the SQL stays
+        # the same size however many accounts the viewer follows.
+        follows = CustomUser.followers.through.objects.filter(
+            from_customuser=OuterRef('author_id'), to_customuser=viewer,
+        )
+        return self.exclude(author=viewer).exclude(Exists(follows))
+
+    def for_cards(self, viewer):
+        # Everything a recipe card renders (author, tags, like state/count)
+        # in a fixed number of queries, whatever the page size.
+        return self.select_related('author').prefetch_related('tags').with_like_state(viewer)
 
 
 class Recipe(models.Model):
@@ -68,6 +149,12 @@ class Recipe(models.Model):
     servings = models.PositiveIntegerField()
     difficulty = models.CharField(max_length=10, choices=DIFFICULTY_CHOICES)
     image = models.ImageField(upload_to='recipes/', blank=True, null=True)
+    # Resized copies, built in the background (see myapp/images.py)
+    image_variants = models.JSONField(default=dict, blank=True)
+    # Size of the upload and a tiny inline preview, set by the same job
+    image_width = models.PositiveIntegerField(null=True, blank=True)
+    image_height = models.PositiveIntegerField(null=True, blank=True)
+    image_placeholder = models.TextField(blank=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recipes')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -75,10 +162,27 @@ class Recipe(models.Model):
     likes = models.ManyToManyField(User, through='Like', related_name='liked_recipes')
     tags = models.ManyToManyField('Tag', related_name='recipes', blank=True)
 
+    # Denormalized COUNT of Like rows, kept in step by toggle_like and
+    # repaired by `manage.py reconcile_like_counts`.
+    like_count = models.PositiveIntegerField(default=0)
+
+    # Time-decayed popularity in log2 form, see myapp/trending.py.
+    trending_score = models.FloatField(default=0, db_index=True)
+
+    # Number of distinct normalized ingredients (see myapp/ingredients.py)
+    ingredient_count = models.PositiveIntegerField(default=0)
+
     is_promoted = models.BooleanField(default=False, help_text="Mark this recipe as promoted")
 
+    objects = RecipeQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of recipe lists (see myapp/pagination.py)
+            models.Index(fields=['-created_at', '-id'], name='recipe_created_idx'),
+            models.Index(fields=['author', '-created_at', '-id'], name='recipe_author_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -90,7 +194,7 @@ class Recipe(models.Model):
         return self.cook_time
 
     def get_likes_count(self):
-        return self.likes.count()
+        return self.like_count
 
     def get_ingredients_list(self):
         return [ingredient.strip() for ingredient in self.ingredients.split('\n') if ingredient.strip()]
@@ -99,6 +203,26 @@ class Recipe(models.Model):
         return [instruction.strip() for instruction in self.instructions.split('\n') if instruction.strip()]
 
 
+class FeedEntry(models.Model):
+    # Materialized home timeline: one row per (reader, recipe), written when a
+    # recipe is published or an author is followed, so the feed is a range read.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='feed_entries')
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='feed_entries')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()  # copied from recipe.created_at
+
+    class Meta:
+        ordering = ['-created_at', '-recipe']
+        unique_together = ('user', 'recipe')
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-recipe'], name='feedentry_user_created_idx'),
+            models.Index(fields=['user', 'author'], name='feedentry_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe.title} in feed of {self.user.username}'
+
+
 class Like(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
@@ -106,11 +230,34 @@ class Like(models.Model):
 
     class Meta:
         unique_together = ('user', 'recipe')
+        indexes = [
+            # Counting a recipe's likes since a point in time (notifications.py)
+            models.Index(fields=['recipe', 'created_at'], name='like_recipe_time_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user.username} likes {self.recipe.title}'
 
 
+class Ingredient(models.Model):
+    name = models.CharField(max_length=100, unique=True)  # normalized token, e.g. "tomato"
+
+    def __str__(self):
+        return self.name
+
+
+class RecipeIngredient(models.Model):
+    # Posting list entry of the ingredient -> recipe inverted index.
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name='postings')
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='ingredient_postings')
+
+    class Meta:
+        unique_together = ('ingredient', 'recipe')
+
+    def __str__(self):
+        return f'{self.ingredient.name} in {self.recipe.title}'
+
+
 class Comment(models.Model):
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -128,6 +275,9 @@ class Comment(models.Model):
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
 
+    # Refreshed by `manage.py compute_tag_stats`
+    recipe_count = models.PositiveIntegerField(default=0)
+
     def __str__(self):
         return self.name
 
@@ -135,9 +285,69 @@ class Tag(models.Model):
         return reverse('recipes:tag', kwargs={'tag_name': self.name})
 
 
+class TagCooccurrence(models.Model):
+    # How many recipes carry both `tag` and `related_tag`; the top few per
+    # tag are precomputed by `manage.py compute_tag_stats`.
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='related_tags')
+    related_tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField()
 
+    class Meta:
+        ordering = ['-count', 'id']
+        unique_together = ('tag', 'related_tag')
+        indexes = [
+            models.Index(fields=['tag', '-count'], name='tagcooccurrence_tag_idx'),
+        ]
 
+    def __str__(self):
+        return f'{self.tag.name} + {self.related_tag.name} ({self.count})'
+
+
+class TermHead(Func):
+    # The first `length` characters. The length is written into the SQL
+    # rather than bound: SQLite only uses an expression index when the
+    # query's expression matches it literally, and a parameter never does.
+    function = 'SUBSTR'
+    template = '%(function)s(%(expressions)s, 1, %(length)d)'
+    output_field = models.CharField()
 
+    def __init__(self, expression, length, **extra):
+        super().__init__(expression, length=int(length), **extra)
+
+
+class AutocompleteEntry(models.Model):
+    # Prefix index behind ajax_search/search_users: one row per searchable
+    # term of a user or tag, maintained by myapp/autocomplete.py.
+    KIND_CHOICES = (
+        ('user', 'User'),
+        ('tag', 'Tag'),
+    )
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    term = models.CharField(max_length=255)  # normalized (lowercase) search key
+    label = models.CharField(max_length=255)  # username / tag name to display
+    weight = models.PositiveIntegerField(default=0)  # followers / recipes, for ranking
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'term', 'weight'], name='autocomplete_rank_idx'),
+            # 1- and 2-character prefixes, read in weight order by suggest()
+            models.Index(F('kind'), TermHead('term', 1), F('weight'), name='autocomplete_head1_idx'),
+            models.Index(F('kind'), TermHead('term', 2), F('weight'), name='autocomplete_head2_idx'),
+            models.Index(fields=['kind', 'object_id'], name='autocomplete_object_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.term}'
+
+    @classmethod
+    def reweight_user(cls, user_id):
+        # follow()/unfollow() change num_followers with update(), which the
+        # post_save indexer never sees.
+        cls.objects.filter(kind='user', object_id=user_id).update(
+            weight=Subquery(CustomUser.objects.filter(pk=user_id).values('num_followers')[:1])
+        )
 
 
 class Notification(models.Model):
@@ -154,23 +364,26 @@ class Notification(models.Model):
     recipe = models.ForeignKey('Recipe', on_delete=models.CASCADE, null=True, blank=True)
     is_read = models.BooleanField(default=False)
     timestamp = models.DateTimeField(auto_now_add=True)
+    # Likes on one recipe are coalesced into a single unread row (see
+    # myapp/notifications.py): how many people, and the latest few of them.
+    actor_count = models.PositiveIntegerField(default=1)
+    recent_actors = models.JSONField(default=list, blank=True)
+    # Likes made since this moment are the ones the row stands for
+    started_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['to_user', 'recipe', 'notification_type', 'is_read'], name='notification_group_idx'),
+            # Notification center pages and unread lookups
+            models.Index(fields=['to_user', '-timestamp', '-id'], name='notification_list_idx'),
+            models.Index(fields=['to_user', 'is_read', '-timestamp'], name='notification_unread_idx'),
+        ]
 
     def __str__(self):
         return f"{self.notification_type} to {self.to_user.username}"
 
 
-
-
-
-
-
-
-
-
-
 class Message(models.Model):
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sent_messages')
     recipient = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='received_messages', on_delete=models.CASCADE)
@@ -179,15 +392,39 @@ class Message(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # One direction of a thread, newest first; a conversation page
+            # merges the two directions (see views.conversation_page)
+            models.Index(fields=['sender', 'recipient', '-timestamp', '-id'], name='message_thread_idx'),
+            models.Index(fields=['recipient', 'is_read'], name='message_unread_idx'),
+        ]
+
     def __str__(self):
         if self.recipe:
             return f"From {self.sender} to {self.recipient} - Recipe: {self.recipe.title}"
         return f"From {self.sender} to {self.recipient} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
 
+class Conversation(models.Model):
+    # Inbox summary: one row per participant of each user pair, holding that
+    # side's view of the thread (latest message, unread counter). Kept up to
+    # date by myapp/messaging.py so the inbox is a single range read.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='conversations')
+    other_user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    last_message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_at = models.DateTimeField()
+    unread_count = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        ordering = ['-last_message_at', '-id']
+        unique_together = ('user', 'other_user')
+        indexes = [
+            models.Index(fields=['user', '-last_message_at', '-id'], name='conversation_inbox_idx'),
+        ]
 
-
+    def __str__(self):
+        return f"{self.user} with {self.other_user}"
 
 
 class SpecialOffer(models.Model):
@@ -199,9 +436,72 @@ class SpecialOffer(models.Model):
     title = models.CharField(max_length=100)
     description = models.TextField()
     image = models.ImageField(upload_to='offers/', blank=True, null=True)
+    # Resized copies, built in the background (see myapp/images.py)
+    image_variants = models.JSONField(default=dict, blank=True)
+    # Size of the upload and a tiny inline preview, set by the same job
+    image_width = models.PositiveIntegerField(null=True, blank=True)
+    image_height = models.PositiveIntegerField(null=True, blank=True)
+    image_placeholder = models.TextField(blank=True)
     start_date = models.DateField()
     end_date = models.DateField()
     is_active = models.BooleanField(default=True)
 
     def __str__(self):
         return f"{self.title} - {self.restaurant.username}"
+
+
+class Job(models.Model):
+    # Background work queued by views and run by `manage.py run_worker`
+    # (see myapp/tasks.py). Finished jobs are deleted; failed ones are kept.
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    )
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'task', 'run_at'], name='job_ready_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+
+class RealtimeEvent(models.Model):
+    # Outbox for live push across processes (realtime.DatabaseBroker): the
+    # web server and `manage.py run_worker` write here, and each ASGI
+    # process polls for its connected users. Rows are short-lived.
+    user_id = models.PositiveBigIntegerField()
+    event = models.CharField(max_length=50)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_id', 'id'], name='realtimeevent_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event} for user {self.user_id}"
+
+
+class MediaBlob(models.Model):
+    # One stored upload in the content-addressed media storage
+    # (myapp/storage.py) and how many images point at it.
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
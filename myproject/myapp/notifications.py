@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import realtime
+from .models import CustomUser, Like, Notification
+
+# Like notifications are coalesced: while an author has an unread "like"
+# notification for a recipe that was touched within WINDOW, further likes
+# update that row in place ("X and 1,203 others liked your recipe") instead
+# of inserting a new one. Once it is read, the next like starts a new row.
+# The count and names are recomputed from the Like table on every like and
+# un-like, so they always match who currently likes the recipe.
+
+WINDOW = timedelta(hours=24)
+
+# Actors kept on the row, newest first
+RECENT_ACTORS = 3
+
+
+def like_message(actors, count, recipe):
+    name = actors[0]['name'] if actors else 'Someone'
+    others = count - 1
+    if others <= 0:
+        return f"{name} liked your recipe '{recipe.title}'."
+    return f"{name} and {others:,} other{'s' if others > 1 else ''} liked your recipe '{recipe.title}'."
+
+
+def notify_like(recipe, user):
+    like = Like.objects.filter(recipe=recipe, user=user).first()
+    if like is None:
+        return None  # un-liked again before the job ran
+    with transaction.atomic():
+        notification = _open_like_notification(recipe)
+        if notification is None:
+            notification = Notification(
+                to_user_id=recipe.author_id, notification_type='like', recipe=recipe, started_at=like.created_at,
+            )
+        elif like.created_at < notification.started_at:
+            notification.started_at = like.created_at  # jobs may run out of order
+        notification.timestamp = timezone.now()
+        _recount(notification, recipe)
+        if notification.pk is None:
+            notification.save()
+            return notification
+        _save_recount(notification)
+        realtime.publish(notification.to_user_id, 'notification_updated', realtime.notification_payload(notification))
+    return notification
+
+
+def unnotify_like(recipe, user_id):
+    # Called after an un-like: drops the liker from the open notification,
+    # or the notification itself when nobody is left.
+    with transaction.atomic():
+        notification = _open_like_notification(recipe)
+        if notification is None:
+            return None
+        _recount(notification, recipe)
+        if not notification.actor_count:
+            notification.delete()
+            return None
+        _save_recount(notification)
+        realtime.publish(notification.to_user_id, 'notification_updated', realtime.notification_payload(notification))
+    return notification
+
+
+def _open_like_notification(recipe):
+    return (
+        Notification.objects.select_for_update()
+        .filter(to_user_id=recipe.author_id, recipe=recipe, notification_type='like',
+                is_read=False, timestamp__gte=timezone.now() - WINDOW)
+        .order_by('-timestamp')
+        .first()
+    )
+
+
+def _recount(notification, recipe):
+    # Distinct likers since the row started, read off the Like table (one
+    # like per user), so un-liking and liking again can't count anyone twice.
+    likes = Like.objects.filter(recipe=recipe, created_at__gte=notification.started_at).exclude(user_id=recipe.author_id)
+    recent = list(likes.select_related('user').order_by('-created_at', '-id')[:RECENT_ACTORS])
+    notification.actor_count = likes.count()
+    notification.recent_actors = [{'id': like.user_id, 'name': like.user.get_display_name()} for like in recent]
+    notification.from_user_id = recent[0].user_id if recent else None
+    notification.message = like_message(notification.recent_actors, notification.actor_count, recipe)
+
+
+def _save_recount(notification):
+    Notification.objects.filter(pk=notification.pk).update(
+        actor_count=notification.actor_count,
+        recent_actors=notification.recent_actors,
+        message=notification.message,
+        from_user_id=notification.from_user_id,
+        started_at=notification.started_at,
+        timestamp=notification.timestamp,
+    )
+
+
+def notify_follow(user_id, follower):
+    return Notification.objects.create(
+        to_user_id=user_id, from_user=follower, notification_type='follow',
+        message=f"{follower.get_display_name()} started following you.",
+    )
+
+
+def mark_read(user, notifications):
+    # Marks just `notifications` (e.g. the page being viewed) as read.
+    ids = [n.pk for n in notifications if not n.is_read]
+    if not ids:
+        return 0
+    with transaction.atomic():
+        updated = Notification.objects.filter(pk__in=ids, is_read=False).update(is_read=True)
+        if updated:
+            CustomUser.objects.filter(pk=user.pk).update(
+                num_unread_notifications=Greatest(F('num_unread_notifications') - updated, 0)
+            )
+    user.num_unread_notifications = max(user.num_unread_notifications - updated, 0)
+    return updated
@@ -0,0 +1,76 @@
+import base64
+from collections import namedtuple
+from datetime import datetime
+
+# Keyset ("seek") pagination over a (timestamp, id) pair. Each page is a
+# bounded index range read that starts where the previous one stopped, so
+# page 1000 costs the same as page 1 (no OFFSET).
+
+PAGE_SIZE = 12
+
+Page = namedtuple('Page', ['items', 'next_cursor'])
+
+
+def encode_cursor(timestamp, pk):
+    raw = f'{timestamp.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    # Returns (timestamp, pk), or None for a missing or tampered cursor.
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, pk = raw.split('|')
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def paginate(queryset, cursor, fields=('created_at', 'id'), limit=PAGE_SIZE):
+    # `fields` are the (timestamp, id) columns, newest first.
+    time_field, id_field = fields
+    queryset = queryset.order_by(f'-{time_field}', f'-{id_field}')
+
+    position = decode_cursor(cursor)
+    if position:
+        timestamp, pk = position
+        # "Older than the cursor" as a range on the timestamp column, so the
+        # index seek starts at the cursor instead of at the newest row
+        queryset = queryset.filter(**{f'{time_field}__lte': timestamp}).exclude(
+            **{time_field: timestamp, f'{id_field}__gte': pk}
+        )
+
+    items = list(queryset[:limit + 1])
+    return _page(items, fields, limit, len(items) > limit)
+
+
+def paginate_union(querysets, cursor, fields=('created_at', 'id'), limit=PAGE_SIZE):
+    # One page over several disjoint querysets (e.g. both directions of a
+    # conversation). Each is paginated on its own index, then the pages are
+    # merged here; an OR across them would sort the whole result instead.
+    time_field, id_field = fields
+    pages = [paginate(queryset, cursor, fields, limit) for queryset in querysets]
+    items = sorted(
+        (item for page in pages for item in page.items),
+        key=lambda item: (getattr(item, time_field), getattr(item, _attname(id_field))),
+        reverse=True,
+    )
+    more = len(items) > limit or any(page.next_cursor for page in pages)
+    return _page(items, fields, limit, more)
+
+
+def _page(items, fields, limit, more):
+    time_field, id_field = fields
+    items = items[:limit]
+    next_cursor = None
+    if more and items:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, time_field), getattr(last, _attname(id_field)))
+    return Page(items, next_cursor)
+
+
+def _attname(field):
+    # 'id' -> 'id', 'recipe' -> 'recipe_id'
+    return field if field in ('id', 'pk') or field.endswith('_id') else f'{field}_id'
@@ -0,0 +1,153 @@
+import asyncio
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from functools import cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import RealtimeEvent
+
+# Push of new messages and notifications to connected browsers. Writers call
+# `publish(user_id, event, data)`; the /events/ Server-Sent-Events view
+# listens on the broker for the signed-in user.
+#
+# LocalBroker keeps subscribers in this process, so it only reaches clients
+# of the process that published. DatabaseBroker (the default in settings)
+# goes through the RealtimeEvent table, which also carries events published
+# by `manage.py run_worker` (like and follow notifications) and works with
+# several ASGI processes. An external pub/sub can be plugged in the same way
+# via settings.REALTIME_BROKER.
+
+KEEPALIVE_SECONDS = 25
+
+# Events buffered per connection; a client that falls further behind than
+# this misses events rather than growing memory.
+QUEUE_SIZE = 100
+
+# DatabaseBroker: how often each process checks for new events, how long
+# rows are kept, and how often `manage.py run_worker` deletes older ones
+POLL_SECONDS = 1
+RETENTION = timedelta(minutes=5)
+PRUNE_SECONDS = 60
+
+
+class LocalBroker:
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, user_id, event):
+        # Safe to call from any thread (sync views run outside the event loop)
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_offer, queue, event)
+
+    async def listen(self, user_id, timeout=KEEPALIVE_SECONDS):
+        # Yields events for `user_id`, or None after `timeout` idle seconds
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(QUEUE_SIZE))
+        with self._lock:
+            self._subscribers[user_id].add(subscriber)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber[1].get(), timeout)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._subscribers[user_id].discard(subscriber)
+                if not self._subscribers[user_id]:
+                    del self._subscribers[user_id]
+
+
+def _offer(queue, event):
+    if not queue.full():
+        queue.put_nowait(event)
+
+
+class DatabaseBroker(LocalBroker):
+    # publish() writes a RealtimeEvent row from whichever process it runs
+    # in. One poller per ASGI process reads new rows for the users connected
+    # to it and hands them to the in-process subscribers, so the database
+    # sees one query per POLL_SECONDS however many streams are open.
+    def __init__(self):
+        super().__init__()
+        self._poller = None
+
+    def publish(self, user_id, event):
+        RealtimeEvent.objects.create(user_id=user_id, event=event['event'], data=event['data'])
+
+    def listen(self, user_id, timeout=KEEPALIVE_SECONDS):
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.get_running_loop().create_task(self._poll())
+        return super().listen(user_id, timeout)
+
+    async def _poll(self):
+        last_id = await sync_to_async(_latest_event_id)()
+        while True:
+            await asyncio.sleep(POLL_SECONDS)
+            with self._lock:
+                user_ids = list(self._subscribers)
+            if user_ids:
+                last_id, rows = await sync_to_async(_events_since)(last_id, user_ids)
+                for user_id, event, data in rows:
+                    super().publish(user_id, {'event': event, 'data': data})
+
+
+def _latest_event_id():
+    return RealtimeEvent.objects.aggregate(last=Max('id'))['last'] or 0
+
+
+def _events_since(last_id, user_ids):
+    # Events after `last_id` for `user_ids`, and the new high-water mark.
+    # Events for users not connected here are skipped, not delivered late.
+    latest = _latest_event_id()
+    rows = list(
+        RealtimeEvent.objects.filter(id__gt=last_id, id__lte=latest, user_id__in=user_ids)
+        .order_by('id').values_list('user_id', 'event', 'data')
+    )
+    return latest, rows
+
+
+@cache
+def get_broker():
+    return import_string(getattr(settings, 'REALTIME_BROKER', 'myapp.realtime.DatabaseBroker'))()
+
+
+def prune_events():
+    # Called every PRUNE_SECONDS by `manage.py run_worker`
+    RealtimeEvent.objects.filter(created_at__lt=timezone.now() - RETENTION).delete()
+
+
+def publish(user_id, event, data):
+    # Sent once the surrounding transaction commits, so clients never see
+    # rows that were rolled back.
+    transaction.on_commit(lambda: get_broker().publish(user_id, {'event': event, 'data': data}))
+
+
+def message_payload(message):
+    return {
+        'id': message.id,
+        'sender_id': message.sender_id,
+        'sender': message.sender.username,
+        'message': message.message,
+        'recipe_id': message.recipe_id,
+        'recipe_title': message.recipe.title if message.recipe_id else '',
+        'timestamp': message.timestamp.isoformat(),
+    }
+
+
+def notification_payload(notification):
+    return {
+        'id': notification.id,
+        'type': notification.notification_type,
+        'message': notification.message,
+        'recipe_id': notification.recipe_id,
+    }
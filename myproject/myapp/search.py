@@ -0,0 +1,88 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Recipe
+
+# Full-text recipe search on an SQLite FTS5 table (created in migration
+# 0019). The table's rowid is the recipe id. signals.py keeps it in sync;
+# `manage.py rebuild_search_index` rebuilds it from scratch. On other
+# databases search falls back to icontains.
+
+FTS_TABLE = 'myapp_recipe_fts'
+
+# bm25 column weights: title, description, ingredients, tags
+RANKING = f'bm25({FTS_TABLE}, 10.0, 2.0, 4.0, 6.0)'
+
+PAGE_SIZE = 20
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def index_recipe(recipe):
+    if not is_available():
+        return
+    tags = ' '.join(recipe.tags.values_list('name', flat=True))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [recipe.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description, ingredients, tags) VALUES (%s, %s, %s, %s, %s)',
+            [recipe.pk, recipe.title, recipe.description, recipe.ingredients, tags],
+        )
+
+
+def unindex_recipe(recipe_id):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [recipe_id])
+
+
+def rebuild_index(batch_size=500):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    indexed = 0
+    for recipe in Recipe.objects.prefetch_related('tags').iterator(chunk_size=batch_size):
+        tags = ' '.join(tag.name for tag in recipe.tags.all())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description, ingredients, tags) VALUES (%s, %s, %s, %s, %s)',
+                [recipe.pk, recipe.title, recipe.description, recipe.ingredients, tags],
+            )
+        indexed += 1
+    return indexed
+
+
+def match_expression(query):
+    # Turn free text into a safe FTS5 query: every word must match, and the
+    # last one may be a prefix (so results show up while typing).
+    words = re.findall(r'\w+', query.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_recipe_ids(query, page=1, limit=PAGE_SIZE):
+    # Best-ranked recipe ids for `query`, plus one extra to detect a next page.
+    offset = (page - 1) * limit
+    if not is_available():
+        matches = Recipe.objects.filter(
+            Q(title__icontains=query) | Q(description__icontains=query) |
+            Q(ingredients__icontains=query) | Q(tags__name__icontains=query)
+        ).distinct()
+        return list(matches.values_list('id', flat=True)[offset:offset + limit + 1])
+
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY {RANKING} LIMIT %s OFFSET %s',
+            [expression, limit + 1, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,141 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import autocomplete, images, ingredients, realtime, search, tasks
+from .models import CustomUser, Message, Notification, Recipe, SpecialOffer, Tag
+
+
+# ---------- FULL-TEXT INDEX ----------
+
+@receiver(post_save, sender=Recipe)
+def index_saved_recipe(sender, instance, **kwargs):
+    search.index_recipe(instance)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def index_retagged_recipe(sender, instance, action, reverse, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and not reverse:
+        search.index_recipe(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_deleted_recipe(sender, instance, **kwargs):
+    search.unindex_recipe(instance.pk)
+
+
+# ---------- INGREDIENT INDEX ----------
+
+@receiver(post_save, sender=Recipe)
+def index_recipe_ingredients(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'ingredients' in update_fields:
+        ingredients.index_recipe(instance)
+
+
+# ---------- AUTOCOMPLETE ----------
+
+@receiver(post_save, sender=CustomUser)
+def index_saved_user(sender, instance, update_fields=None, **kwargs):
+    autocomplete.index_user(instance, update_fields)
+
+
+@receiver(post_delete, sender=CustomUser)
+def unindex_deleted_user(sender, instance, **kwargs):
+    autocomplete.remove('user', instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+def index_saved_tag(sender, instance, **kwargs):
+    autocomplete.index_tag(instance)
+
+
+@receiver(post_delete, sender=Tag)
+def unindex_deleted_tag(sender, instance, **kwargs):
+    autocomplete.remove('tag', instance.pk)
+
+
+# ---------- REAL-TIME PUSH ----------
+
+@receiver(post_save, sender=Message)
+def push_new_message(sender, instance, created, **kwargs):
+    if created and instance.recipient_id != instance.sender_id:
+        realtime.publish(instance.recipient_id, 'message', realtime.message_payload(instance))
+
+
+@receiver(post_save, sender=Notification)
+def push_new_notification(sender, instance, created, **kwargs):
+    if created:
+        realtime.publish(instance.to_user_id, 'notification', realtime.notification_payload(instance))
+
+
+# ---------- UNREAD NOTIFICATION COUNT ----------
+
+@receiver(post_save, sender=Notification)
+def count_new_notification(sender, instance, created, **kwargs):
+    if created and not instance.is_read:
+        CustomUser.objects.filter(pk=instance.to_user_id).update(
+            num_unread_notifications=F('num_unread_notifications') + 1
+        )
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_deleted_notification(sender, instance, **kwargs):
+    if not instance.is_read:
+        CustomUser.objects.filter(pk=instance.to_user_id, num_unread_notifications__gt=0).update(
+            num_unread_notifications=F('num_unread_notifications') - 1
+        )
+
+
+# ---------- IMAGE VARIANTS ----------
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=CustomUser)
+@receiver(post_save, sender=SpecialOffer)
+def queue_image_variants(sender, instance, update_fields=None, **kwargs):
+    for field_name in images.IMAGE_FIELDS[sender._meta.label_lower]:
+        if update_fields is not None and field_name not in update_fields:
+            continue  # e.g. the last_login update on every login
+        if images.needs_variants(instance, field_name):
+            tasks.enqueue('image_variants', model=sender._meta.label_lower, pk=instance.pk, field=field_name)
+
+
+# ---------- MEDIA REFERENCES ----------
+# Each stored image holds a reference on its blob (myapp/storage.py);
+# give it back when the image is replaced or its owner deleted.
+
+@receiver(pre_save, sender=Recipe)
+@receiver(pre_save, sender=CustomUser)
+@receiver(pre_save, sender=SpecialOffer)
+def remember_replaced_images(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None:
+        return
+    fields = [
+        field_name for field_name in images.IMAGE_FIELDS[sender._meta.label_lower]
+        if (update_fields is None or field_name in update_fields) and not getattr(instance, field_name)._committed
+    ]
+    if fields:
+        instance._replaced_images = sender.objects.filter(pk=instance.pk).values(*fields).first() or {}
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=CustomUser)
+@receiver(post_save, sender=SpecialOffer)
+def release_replaced_images(sender, instance, **kwargs):
+    for field_name, name in instance.__dict__.pop('_replaced_images', {}).items():
+        if name:
+            storage = instance._meta.get_field(field_name).storage
+            transaction.on_commit(lambda storage=storage, name=name: storage.delete(name))
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_delete, sender=SpecialOffer)
+def release_deleted_images(sender, instance, **kwargs):
+    for field_name in images.IMAGE_FIELDS[sender._meta.label_lower]:
+        fieldfile = getattr(instance, field_name)
+        variants = getattr(instance, images.variants_field(field_name))
+        if fieldfile:
+            transaction.on_commit(lambda storage=fieldfile.storage, name=fieldfile.name: storage.delete(name))
+        if variants:
+            transaction.on_commit(lambda variants=variants: images.delete_files(variants))
@@ -0,0 +1,60 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+from .models import MediaBlob
+
+# Content-addressed media storage. An upload is stored once under the
+# SHA-256 of its bytes (blobs/ab/cd/<digest>.jpg), whatever name it was
+# uploaded with, so re-uploading the same image (a restaurant's logo on
+# every offer) reuses the existing file. MediaBlob counts the references:
+# every save() adds one, every delete() drops one, and the file is removed
+# with the last. signals.py releases the files of deleted or replaced
+# Recipe / CustomUser / SpecialOffer images.
+#
+# A blob's URL changes whenever its content does, so it can be cached
+# forever. Files stored before this backend (recipes/..., offers/...) are
+# served and deleted as before.
+
+BLOB_PREFIX = 'blobs/'
+
+
+def blob_name(digest, name):
+    ext = os.path.splitext(name)[1].lower()
+    return f'{BLOB_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def __init__(self, *args, **kwargs):
+        # Same name means same bytes, so writing over a blob is harmless
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(*args, **kwargs)
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        name = blob_name(digest.hexdigest(), name)
+
+        with transaction.atomic():
+            known = MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+            if not (known and self.exists(name)):
+                name = super()._save(name, content)
+            if not known:
+                MediaBlob.objects.create(name=name, size=content.size, ref_count=1)
+        return name
+
+    def delete(self, name):
+        if not name or not name.startswith(BLOB_PREFIX):
+            return super().delete(name)
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob and blob.ref_count > 1:
+                MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return
+            if blob:
+                blob.delete()
+            super().delete(name)
@@ -0,0 +1,138 @@
+import traceback
+from collections import namedtuple
+from datetime import timedelta
+
+from django.apps import apps
+from django.db.models import F
+from django.utils import timezone
+
+from . import images, notifications, timeline
+from .models import CustomUser, Job, Recipe
+
+# Background jobs on a database-backed queue. Views call
+# `enqueue('task_name', **payload)` (the job is committed together with the
+# request's own writes) and `manage.py run_worker` claims and runs them on a
+# thread pool. A failing job is retried with exponential backoff until it
+# has used its `max_attempts`, then left with status 'failed'.
+#
+# Jobs don't run in a transaction of their own: with SQLite's IMMEDIATE
+# mode that would hold the write lock for the whole job. Tasks commit in
+# small steps and must be safe to run again after a partial failure.
+
+Task = namedtuple('Task', ['func', 'concurrency', 'max_attempts'])
+
+registry = {}
+
+BACKOFF_SECONDS = 10
+MAX_BACKOFF = timedelta(hours=1)
+
+# A job still 'running' after this long belongs to a worker that died
+STALE_AFTER = timedelta(minutes=10)
+
+
+def task(name, concurrency=1, max_attempts=5):
+    # `concurrency` caps how many jobs of this type one worker runs at once
+    def register(func):
+        registry[name] = Task(func, concurrency, max_attempts)
+        return func
+    return register
+
+
+def enqueue(name, **payload):
+    if name not in registry:
+        raise ValueError(f"Unknown task {name!r}")
+    return Job.objects.create(task=name, payload=payload)
+
+
+def claim(name, limit):
+    # Oldest ready jobs of type `name`. The conditional UPDATE makes the
+    # claim atomic, so several workers can share the queue.
+    now = timezone.now()
+    ready = (
+        Job.objects.filter(status='queued', task=name, run_at__lte=now)
+        .order_by('run_at', 'id').values_list('id', flat=True)[:limit]
+    )
+    claimed = [
+        job_id for job_id in ready
+        if Job.objects.filter(pk=job_id, status='queued').update(
+            status='running', locked_at=now, attempts=F('attempts') + 1,
+        )
+    ]
+    return list(Job.objects.filter(pk__in=claimed))
+
+
+def run(job):
+    # Returns True if the job succeeded.
+    spec = registry.get(job.task)
+    try:
+        if spec is None:
+            raise LookupError(f"Unknown task {job.task!r}")
+        spec.func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if spec is None or job.attempts >= spec.max_attempts:
+            Job.objects.filter(pk=job.pk).update(status='failed', locked_at=None, last_error=error)
+        else:
+            delay = min(timedelta(seconds=BACKOFF_SECONDS * 2 ** (job.attempts - 1)), MAX_BACKOFF)
+            Job.objects.filter(pk=job.pk).update(
+                status='queued', locked_at=None, run_at=timezone.now() + delay, last_error=error,
+            )
+        return False
+    Job.objects.filter(pk=job.pk).delete()
+    return True
+
+
+def requeue_stale():
+    return Job.objects.filter(status='running', locked_at__lt=timezone.now() - STALE_AFTER).update(
+        status='queued', locked_at=None,
+    )
+
+
+# ---------- TASKS ----------
+
+@task('notify_like', concurrency=4)
+def notify_like(recipe_id, user_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    user = CustomUser.objects.filter(pk=user_id).first()
+    if recipe and user:
+        notifications.notify_like(recipe, user)
+
+
+@task('unnotify_like', concurrency=4)
+def unnotify_like(recipe_id, user_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe:
+        notifications.unnotify_like(recipe, user_id)
+
+
+@task('notify_follow', concurrency=4)
+def notify_follow(user_id, follower_id):
+    follower = CustomUser.objects.filter(pk=follower_id).first()
+    if follower:
+        notifications.notify_follow(user_id, follower)
+
+
+@task('fan_out_recipe', concurrency=2)
+def fan_out_recipe(recipe_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).select_related('author').first()
+    if recipe:
+        timeline.fan_out_recipe(recipe)
+
+
+@task('backfill_author', concurrency=2)
+def backfill_author(user_id, author_id):
+    author = CustomUser.objects.filter(pk=author_id).first()
+    # Skip if they unfollowed again before the job ran
+    if author and author.followers.filter(pk=user_id).exists():
+        timeline.backfill_author(CustomUser(pk=user_id), author)
+
+
+@task('image_variants', concurrency=2, max_attempts=3)
+def image_variants(model, pk, field):
+    instance = apps.get_model(model).objects.filter(pk=pk).first()
+    # Skip if deleted, or already done by an earlier job for the same upload
+    if instance and images.needs_variants(instance, field):
+        try:
+            images.build_variants(instance, field)
+        except images.DECODE_ERRORS:
+            pass  # recorded on the row; not worth retrying
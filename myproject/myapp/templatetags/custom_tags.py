@@ -1,6 +1,51 @@
 from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from myapp import images
+
 register = template.Library()
 
 @register.filter
 def has_key(dict_obj, key):
     return key in dict_obj
+
+
+@register.filter
+def variant_url(fieldfile, name):
+    # {{ recipe.image|variant_url:'card' }}: the JPEG variant, or the original
+    # upload until variants have been built.
+    if not fieldfile:
+        return ''
+    variant = images.current_variants(fieldfile).get(name)
+    return default_storage.url(variant['jpeg']) if variant else fieldfile.url
+
+
+@register.simple_tag
+def picture(fieldfile, name, **attrs):
+    # {% picture recipe.image 'card' alt=recipe.title class='recipe-img' %}
+    # renders a <picture> offering the WebP variant with a JPEG fallback.
+    # The image is lazy-loaded (pass loading='eager' above the fold) and,
+    # once the variants job has run, reserves its box via aspect-ratio with
+    # the inline placeholder showing until the real bytes arrive.
+    if not fieldfile:
+        return ''
+    variant = images.current_variants(fieldfile).get(name)
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+
+    preview = images.placeholder(fieldfile)
+    if variant and preview:
+        style = (
+            f"aspect-ratio: {variant['width']} / {variant['height']}; "
+            f"background: url({preview[0]}) center / cover no-repeat;"
+        )
+        attrs['style'] = f"{style} {attrs['style']}" if attrs.get('style') else style
+
+    img_attrs = format_html_join(' ', '{}="{}"', attrs.items())
+    if not variant:
+        return format_html('<img src="{}" {}>', fieldfile.url, img_attrs)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}"><img src="{}" {}></picture>',
+        default_storage.url(variant['webp']), default_storage.url(variant['jpeg']), img_attrs,
+    )
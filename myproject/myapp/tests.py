@@ -1,3 +1,368 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import notifications, tasks
+from .media import parse_range
+from .models import CustomUser, Job, Like, MediaBlob, Message, Notification, Recipe
+from .pagination import decode_cursor, encode_cursor, paginate, paginate_union
+
+
+def make_user(username):
+    return CustomUser.objects.create_user(username=username, password='pw', user_type='user')
+
+
+def make_recipe(author, title='Pie', **fields):
+    return Recipe.objects.create(
+        author=author, title=title, description='d', ingredients='egg', instructions='bake',
+        cook_time=1, servings=1, difficulty='easy', **fields,
+    )
+
+
+def jpeg_bytes(size=(40, 30), color=(200, 80, 40)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def walk(queryset, limit, **kwargs):
+    # Every page of `queryset`, following next_cursor to the end
+    items, cursor = [], None
+    while True:
+        page = paginate(queryset, cursor, limit=limit, **kwargs)
+        items += page.items
+        if not page.next_cursor:
+            return items
+        cursor = page.next_cursor
+
+
+# ---------- PAGINATION ----------
+
+class CursorTests(TestCase):
+    def test_round_trip(self):
+        timestamp = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(timestamp, 42)), (timestamp, 42))
+
+    def test_bad_cursor_is_ignored(self):
+        for cursor in (None, '', 'not base64!', encode_cursor(timezone.now(), 1)[:-3] + 'xyz'):
+            self.assertIsNone(decode_cursor(cursor))
+
+
+class PaginateTests(TestCase):
+    def setUp(self):
+        self.author = make_user('author')
+
+    def test_ties_on_timestamp(self):
+        # Rows sharing a timestamp are split across pages by id, each once
+        recipes = [make_recipe(self.author, title=f'r{i}') for i in range(7)]
+        Recipe.objects.update(created_at=timezone.now())
+
+        items = walk(Recipe.objects.all(), limit=3)
+
+        self.assertEqual([r.id for r in items], sorted((r.id for r in recipes), reverse=True))
+
+    def test_newest_first_across_pages(self):
+        now = timezone.now()
+        for i in range(5):
+            recipe = make_recipe(self.author, title=f'r{i}')
+            Recipe.objects.filter(pk=recipe.pk).update(created_at=now - timedelta(minutes=i % 3))
+
+        items = walk(Recipe.objects.all(), limit=2)
+
+        self.assertEqual(len(items), 5)
+        keys = [(r.created_at, r.id) for r in items]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+    def test_last_page_has_no_cursor(self):
+        make_recipe(self.author)
+        page = paginate(Recipe.objects.all(), None, limit=1)
+        self.assertEqual(len(page.items), 1)
+        self.assertIsNone(page.next_cursor)
+
+    def test_paginate_union(self):
+        a, b = make_user('a'), make_user('b')
+        for i in range(5):
+            Message.objects.create(sender=a, recipient=b, message=f'ab{i}')
+            Message.objects.create(sender=b, recipient=a, message=f'ba{i}')
+        # A tie across the two querysets
+        Message.objects.filter(message__in=['ab2', 'ba2']).update(timestamp=timezone.now())
+        querysets = [Message.objects.filter(sender=a, recipient=b), Message.objects.filter(sender=b, recipient=a)]
+
+        items, cursor = [], None
+        while True:
+            page = paginate_union(querysets, cursor, fields=('timestamp', 'id'), limit=3)
+            self.assertLessEqual(len(page.items), 3)
+            items += page.items
+            if not page.next_cursor:
+                break
+            cursor = page.next_cursor
+
+        expected = Message.objects.order_by('-timestamp', '-id')
+        self.assertEqual([m.id for m in items], [m.id for m in expected])
+
+
+# ---------- MEDIA ----------
+
+class ParseRangeTests(TestCase):
+    def test_satisfiable(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=500-', 1000), (500, 999))
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes = 10 - 20', 1000), (10, 20))
+
+    def test_end_past_the_file_is_clamped(self):
+        self.assertEqual(parse_range('bytes=900-5000', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-5000', 1000), (0, 999))
+
+    def test_unsatisfiable(self):
+        self.assertIs(parse_range('bytes=1000-', 1000), False)
+        self.assertIs(parse_range('bytes=20-10', 1000), False)
+        self.assertIs(parse_range('bytes=-0', 1000), False)
+        self.assertIs(parse_range('bytes=0-', 0), False)
+
+    def test_ignored(self):
+        # Whole file: missing, malformed, other units or several ranges
+        for header in ('', 'bytes=', 'bytes=-', 'items=0-10', 'bytes=0-10,20-30', 'bytes=a-b'):
+            self.assertIsNone(parse_range(header, 1000), header)
+
+
+# ---------- UPLOADS AND STORAGE ----------
+
+class MediaTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+
+class UploadHandlerTests(MediaTestCase):
+    def setUp(self):
+        self.user = make_user('cook')
+        self.client.force_login(self.user)
+
+    def add_recipe(self, upload):
+        return self.client.post(reverse('add_recipe'), {
+            'title': 'Pie', 'description': 'd', 'ingredients': 'egg', 'instructions': 'bake',
+            'cook_time': 1, 'servings': 1, 'difficulty': 'easy', 'image': upload,
+        })
+
+    def test_accepts_image(self):
+        self.add_recipe(SimpleUploadedFile('pie.jpg', jpeg_bytes(), 'image/jpeg'))
+        self.assertTrue(Recipe.objects.get().image)
+
+    def test_rejects_non_image(self):
+        response = self.add_recipe(SimpleUploadedFile('pie.jpg', b'<?php echo 1; ?>', 'image/jpeg'))
+        self.assertContains(response, 'Please upload a JPEG, PNG, GIF or WebP image.')
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_rejects_empty_file(self):
+        response = self.add_recipe(SimpleUploadedFile('pie.jpg', b'', 'image/jpeg'))
+        self.assertContains(response, 'The uploaded image is empty.')
+        self.assertFalse(Recipe.objects.exists())
+
+    @override_settings(IMAGE_UPLOAD_LIMITS={'image': 1024 * 1024})
+    def test_rejects_oversized_image(self):
+        response = self.add_recipe(SimpleUploadedFile('pie.jpg', jpeg_bytes() + b'\0' * 1024 * 1024, 'image/jpeg'))
+        self.assertContains(response, 'Images must be 1 MB or smaller.')
+        self.assertFalse(Recipe.objects.exists())
+
+    @override_settings(UPLOAD_MAX_REQUEST_SIZE=1024)
+    def test_rejects_oversized_request(self):
+        response = self.add_recipe(SimpleUploadedFile('pie.jpg', jpeg_bytes((400, 400)), 'image/jpeg'))
+        self.assertContains(response, 'The upload is too large.')
+        self.assertFalse(Recipe.objects.exists())
+
+
+class BlobStorageTests(MediaTestCase):
+    def setUp(self):
+        self.author = make_user('author')
+
+    def set_image(self, recipe, content):
+        # As the views do: assign the upload, then save
+        recipe.image = SimpleUploadedFile('pie.jpg', content, 'image/jpeg')
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+
+    def recipe_with_image(self, content):
+        recipe = make_recipe(self.author)
+        self.set_image(recipe, content)
+        return recipe
+
+    def test_same_bytes_share_a_blob(self):
+        first = self.recipe_with_image(jpeg_bytes())
+        second = self.recipe_with_image(jpeg_bytes())
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(MediaBlob.objects.get().ref_count, 2)
+
+    def test_replace_releases_old_blob(self):
+        first = self.recipe_with_image(jpeg_bytes())
+        second = self.recipe_with_image(jpeg_bytes())
+        shared = first.image.name
+
+        self.set_image(first, jpeg_bytes(color=(0, 0, 255)))
+
+        self.assertEqual(MediaBlob.objects.get(name=shared).ref_count, 1)
+        self.assertTrue(second.image.storage.exists(shared))
+
+        self.set_image(second, jpeg_bytes(color=(0, 255, 0)))
+
+        self.assertFalse(MediaBlob.objects.filter(name=shared).exists())
+        self.assertFalse(second.image.storage.exists(shared))
+
+    def test_delete_releases_blob(self):
+        first = self.recipe_with_image(jpeg_bytes())
+        second = self.recipe_with_image(jpeg_bytes())
+        name, storage = first.image.name, first.image.storage
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(MediaBlob.objects.get(name=name).ref_count, 1)
+        self.assertTrue(storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+        self.assertFalse(storage.exists(name))
+
+
+# ---------- JOB QUEUE ----------
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def record(**payload):
+            self.calls.append(payload)
+
+        def fail(**payload):
+            raise RuntimeError('boom')
+
+        registry = mock.patch.dict(tasks.registry, {
+            'test_record': tasks.Task(record, 1, 3),
+            'test_fail': tasks.Task(fail, 1, 2),
+        })
+        registry.start()
+        self.addCleanup(registry.stop)
+
+    def test_unknown_task(self):
+        with self.assertRaises(ValueError):
+            tasks.enqueue('no_such_task')
+
+    def test_claim_and_run(self):
+        tasks.enqueue('test_record', value=1)
+        [job] = tasks.claim('test_record', 5)
+
+        self.assertEqual((job.status, job.attempts), ('running', 1))
+        self.assertEqual(tasks.claim('test_record', 5), [])  # already taken
+        self.assertTrue(tasks.run(job))
+        self.assertEqual(self.calls, [{'value': 1}])
+        self.assertFalse(Job.objects.exists())
+
+    def test_claim_respects_limit_and_run_at(self):
+        for i in range(3):
+            tasks.enqueue('test_record', value=i)
+        Job.objects.filter(payload__value=2).update(run_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(len(tasks.claim('test_record', 1)), 1)
+        self.assertEqual(len(tasks.claim('test_record', 5)), 1)
+
+    def test_failure_retries_then_fails(self):
+        tasks.enqueue('test_fail')
+
+        [job] = tasks.claim('test_fail', 1)
+        self.assertFalse(tasks.run(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('boom', job.last_error)
+
+        Job.objects.update(run_at=timezone.now())
+        [job] = tasks.claim('test_fail', 1)
+        self.assertFalse(tasks.run(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+    def test_requeue_stale(self):
+        tasks.enqueue('test_record')
+        tasks.claim('test_record', 1)
+        Job.objects.update(locked_at=timezone.now() - tasks.STALE_AFTER - timedelta(seconds=1))
+
+        self.assertEqual(tasks.requeue_stale(), 1)
+        self.assertEqual(len(tasks.claim('test_record', 1)), 1)
+
+
+# ---------- NOTIFICATIONS ----------
+
+class LikeCoalescingTests(TestCase):
+    def setUp(self):
+        self.author = make_user('author')
+        self.recipe = make_recipe(self.author)
+        self.fans = [make_user(f'fan{i}') for i in range(3)]
+
+    def like(self, user):
+        Like.objects.create(user=user, recipe=self.recipe)
+        return notifications.notify_like(self.recipe, user)
+
+    def unlike(self, user):
+        Like.objects.filter(user=user, recipe=self.recipe).delete()
+        return notifications.unnotify_like(self.recipe, user.id)
+
+    def test_likes_share_one_notification(self):
+        for fan in self.fans:
+            self.like(fan)
+
+        notification = Notification.objects.get(notification_type='like')
+        self.assertEqual(notification.actor_count, 3)
+        self.assertEqual(notification.from_user, self.fans[-1])
+        self.assertEqual(notification.message, "fan2 and 2 others liked your recipe 'Pie'.")
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.num_unread_notifications, 1)
+
+    def test_relike_counts_once(self):
+        self.like(self.fans[0])
+        self.like(self.fans[1])
+        self.unlike(self.fans[0])
+        self.like(self.fans[0])
+
+        self.assertEqual(Notification.objects.get(notification_type='like').actor_count, 2)
+
+    def test_unlike_by_everyone_removes_notification(self):
+        self.like(self.fans[0])
+        self.like(self.fans[1])
+        self.assertEqual(self.unlike(self.fans[1]).actor_count, 1)
+        self.assertIsNone(self.unlike(self.fans[0]))
+
+        self.assertFalse(Notification.objects.exists())
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.num_unread_notifications, 0)
+
+    def test_read_notification_starts_a_new_one(self):
+        first = self.like(self.fans[0])
+        Notification.objects.filter(pk=first.pk).update(is_read=True)
+
+        second = self.like(self.fans[1])
+
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertEqual(second.actor_count, 1)
+
+    def test_stale_job_after_unlike(self):
+        # The job runs after the user already un-liked
+        self.assertIsNone(notifications.notify_like(self.recipe, self.fans[0]))
+        self.assertFalse(Notification.objects.exists())
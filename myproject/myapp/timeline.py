@@ -0,0 +1,54 @@
+from .models import FeedEntry, Recipe
+
+# How many of an author's most recent recipes are copied into a reader's
+# timeline when they start following that author.
+BACKFILL_LIMIT = 100
+
+BATCH_SIZE = 500
+
+
+def add_own_recipe(recipe):
+    # The author's own entry, written in the request so the new recipe is on
+    # their feed straight away; followers get it from fan_out_recipe.
+    FeedEntry.objects.bulk_create([_entry(recipe.author_id, recipe)], ignore_conflicts=True)
+
+
+def fan_out_recipe(recipe):
+    # Push a newly published recipe into the timeline of its author and
+    # every follower of the author. Runs as a background job; each batch is
+    # its own short transaction, and followers are read a batch at a time
+    # so no cursor stays open across the writes.
+    FeedEntry.objects.bulk_create([_entry(recipe.author_id, recipe)], ignore_conflicts=True)
+
+    followers = recipe.author.followers.order_by('id').values_list('id', flat=True)
+    last_id = 0
+    while True:
+        reader_ids = list(followers.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not reader_ids:
+            break
+        FeedEntry.objects.bulk_create([_entry(user_id, recipe) for user_id in reader_ids], ignore_conflicts=True)
+        last_id = reader_ids[-1]
+
+
+def backfill_author(user, author):
+    # Called when `user` starts following `author`.
+    recipes = Recipe.objects.filter(author=author).only('id', 'author_id', 'created_at')[:BACKFILL_LIMIT]
+    FeedEntry.objects.bulk_create(
+        [_entry(user.id, recipe) for recipe in recipes],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune_author(user, author):
+    # Called when `user` stops following `author`.
+    FeedEntry.objects.filter(user=user, author=author).delete()
+
+
+def _entry(user_id, recipe):
+    return FeedEntry(
+        user_id=user_id,
+        recipe_id=recipe.id,
+        author_id=recipe.author_id,
+        created_at=recipe.created_at,
+    )
@@ -0,0 +1,102 @@
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Greatest, Least, Log, Power
+from django.utils import timezone
+
+from .models import Like, Recipe
+
+# Time-decayed popularity. Every like (and the recipe's own publication)
+# contributes 2 ** ((t - EPOCH) / HALF_LIFE), so a like is worth half as much
+# as one HALF_LIFE newer. Ranking by the sum is the same as ranking by the
+# decayed value "now", and the sum never has to be re-decayed. It is stored
+# as log2(sum) in Recipe.trending_score to stay within float range, which
+# also lets a new like be folded in with a single UPDATE.
+
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+HALF_LIFE_HOURS = 24
+
+# record_unlike subtracts in log space only while the remaining mass is at
+# least this far (in exponent units) below the score; closer than that the
+# float difference is mostly rounding and the score is recomputed instead.
+UNLIKE_MARGIN = 1e-6
+
+TOP_N = 100
+TOP_CACHE_KEY = 'trending:top'
+TOP_CACHE_TIMEOUT = 60 * 10
+
+
+def exponent(moment):
+    return (moment - EPOCH).total_seconds() / (HALF_LIFE_HOURS * 3600)
+
+
+def initial_score():
+    # Score of a recipe published now with no likes yet.
+    return exponent(timezone.now())
+
+
+def record_like(recipe_id, liked_at):
+    # log2(2**score + 2**e), computed in the database so concurrent likes
+    # don't overwrite each other.
+    e = Value(exponent(liked_at), output_field=FloatField())
+    hi = Greatest(F('trending_score'), e)
+    lo = Least(F('trending_score'), e)
+    Recipe.objects.filter(pk=recipe_id).update(trending_score=hi + Log(2, 1 + Power(2, lo - hi)))
+    _offer_to_top(recipe_id)
+
+
+def record_unlike(recipe_id, liked_at):
+    # log2(2**score - 2**e). When the like is nearly all of the score (a
+    # recent like on an old recipe), the rest isn't representable as a
+    # difference, so the score is rebuilt from the Like rows instead.
+    # Call after the Like row is deleted, in the same transaction.
+    e = exponent(liked_at)
+    updated = Recipe.objects.filter(pk=recipe_id, trending_score__gte=e + UNLIKE_MARGIN).update(
+        trending_score=F('trending_score') + Log(2, 1 - Power(2, Value(e, output_field=FloatField()) - F('trending_score')))
+    )
+    if not updated:
+        recompute_score(recipe_id)
+    cache.delete(TOP_CACHE_KEY)
+
+
+def recompute_score(recipe_id):
+    created_at = Recipe.objects.filter(pk=recipe_id).values_list('created_at', flat=True).first()
+    if created_at is not None:
+        like_times = Like.objects.filter(recipe_id=recipe_id).values_list('created_at', flat=True)
+        Recipe.objects.filter(pk=recipe_id).update(trending_score=compute_score(created_at, like_times))
+
+
+def compute_score(created_at, like_times):
+    exponents = [exponent(created_at)] + [exponent(t) for t in like_times]
+    top = max(exponents)
+    return top + math.log2(sum(2 ** (x - top) for x in exponents))
+
+
+def top_recipe_ids():
+    # Ids of the TOP_N highest scoring recipes, best first.
+    top = cache.get(TOP_CACHE_KEY)
+    if top is None:
+        top = refresh_top()
+    return [recipe_id for recipe_id, _ in top]
+
+
+def refresh_top():
+    top = list(Recipe.objects.order_by('-trending_score').values_list('id', 'trending_score')[:TOP_N])
+    cache.set(TOP_CACHE_KEY, top, TOP_CACHE_TIMEOUT)
+    return top
+
+
+def _offer_to_top(recipe_id):
+    # Keep the cached top-N current as likes arrive instead of re-querying.
+    top = cache.get(TOP_CACHE_KEY)
+    if top is None:
+        return
+    score = Recipe.objects.filter(pk=recipe_id).values_list('trending_score', flat=True).first()
+    if score is None or (len(top) >= TOP_N and score <= top[-1][1]):
+        return
+    top = [item for item in top if item[0] != recipe_id] + [(recipe_id, score)]
+    top.sort(key=lambda item: item[1], reverse=True)
+    cache.set(TOP_CACHE_KEY, top[:TOP_N], TOP_CACHE_TIMEOUT)
+
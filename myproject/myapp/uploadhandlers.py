@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, StopUpload, TemporaryFileUploadHandler
+
+# Upload handler for the image fields (settings.FILE_UPLOAD_HANDLERS). Every
+# upload streams chunk by chunk into a temp file, so memory stays flat
+# whatever the size. For fields in settings.IMAGE_UPLOAD_LIMITS it also
+#   - checks the first chunk's magic bytes and rejects anything that is not
+#     a JPEG, PNG, GIF or WebP image (including empty files),
+#   - stops writing as soon as the field's byte cap is passed,
+# and gives up on a request whose Content-Length is over
+# settings.UPLOAD_MAX_REQUEST_SIZE without reading it. Rejections land in
+# `request.upload_errors` ({field: message}); see `upload_error()`.
+
+MB = 1024 * 1024
+
+DEFAULT_LIMITS = {
+    'image': 8 * MB,
+    'profile_picture': 4 * MB,
+}
+
+DEFAULT_MAX_REQUEST_SIZE = 16 * MB
+
+# (prefix, offset, content type)
+SIGNATURES = [
+    (b'\xff\xd8\xff', 0, 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 0, 'image/png'),
+    (b'GIF87a', 0, 'image/gif'),
+    (b'GIF89a', 0, 'image/gif'),
+    (b'WEBP', 8, 'image/webp'),  # after b'RIFF' + 4-byte size
+]
+
+
+def sniff(data):
+    for signature, offset, content_type in SIGNATURES:
+        if data[offset:offset + len(signature)] == signature:
+            if content_type != 'image/webp' or data[:4] == b'RIFF':
+                return content_type
+    return None
+
+
+def upload_error(request):
+    # The first rejected upload's message, or None
+    request.FILES  # parse the body if that hasn't happened yet
+    errors = getattr(request, 'upload_errors', None) or {}
+    return next(iter(errors.values()), None)
+
+
+class BoundedImageUploadHandler(TemporaryFileUploadHandler):
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.too_large = content_length > getattr(settings, 'UPLOAD_MAX_REQUEST_SIZE', DEFAULT_MAX_REQUEST_SIZE)
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        # Django closes `handler.file` on SkipFile / StopUpload; don't let that
+        # hit the previous, already completed upload.
+        self.__dict__.pop('file', None)
+        if self.too_large:
+            self._reject(field_name, "The upload is too large.")
+            # Don't read the rest of the body at all
+            raise StopUpload(connection_reset=True)
+
+        self.limit = getattr(settings, 'IMAGE_UPLOAD_LIMITS', DEFAULT_LIMITS).get(field_name)
+        self.received = 0
+        if self.limit is not None and content_length and content_length > self.limit:
+            self._reject(field_name, self._too_big_message())
+            raise SkipFile()
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.limit is not None:
+            if start == 0:
+                content_type = sniff(raw_data[:16])
+                if content_type is None:
+                    self._discard("Please upload a JPEG, PNG, GIF or WebP image.")
+                self.file.content_type = content_type
+            self.received += len(raw_data)
+            if self.received > self.limit:
+                self._discard(self._too_big_message())
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        # An empty file never reaches receive_data_chunk's signature check
+        if self.limit is not None and not file_size:
+            self.file.close()
+            self._reject(self.field_name, "The uploaded image is empty.")
+            return None
+        return super().file_complete(file_size)
+
+    def _too_big_message(self):
+        return f"Images must be {self.limit // MB} MB or smaller."
+
+    def _discard(self, message):
+        # Django closes (and so deletes) the temp file and skips the rest of
+        # this file's bytes
+        self._reject(self.field_name, message)
+        raise SkipFile()
+
+    def _reject(self, field_name, message):
+        if not hasattr(self.request, 'upload_errors'):
+            self.request.upload_errors = {}
+        self.request.upload_errors[field_name] = message
@@ -1,15 +1,23 @@
+import json
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import get_user_model
 from django.contrib import messages
-from django.http import HttpResponseForbidden, JsonResponse
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
-from .models import CustomUser, Recipe, Tag, Message, SpecialOffer
+from .models import CustomUser, Recipe, Tag, Message, SpecialOffer, Conversation
 from django.utils.text import slugify
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import F, Q
 from django.templatetags.static import static
 from django.views.decorators.cache import never_cache
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_POST, require_safe
+from django.template.loader import render_to_string
+from . import autocomplete, media, messaging, notifications, realtime, search, tasks, timeline, trending
+from . import ingredients as ingredient_index
+from .pagination import Page, paginate, paginate_union
+from .uploadhandlers import upload_error
 
 
 User = get_user_model()
@@ -141,7 +149,7 @@ def admin_dashboard(request):
 def approve_restaurant(request, user_id):
     restaurant = get_object_or_404(User, id=user_id, user_type='restaurant')
     restaurant.is_approved = True
-    restaurant.save()
+    restaurant.save(update_fields=['is_approved'])
     return redirect('admin_dashboard')
 
 @require_POST
@@ -178,6 +186,10 @@ def edit_profile_view(request):
         return redirect('edit_restaurant_profile')
 
     if request.method == 'POST':
+        error = upload_error(request)
+        if error:
+            return render(request, 'edit_profile.html', {'user': user, 'error': error})
+
         full_name = request.POST.get('full_name', '').strip()
         username = request.POST.get('username', '').strip()
         email = request.POST.get('email', '').strip()
@@ -201,11 +213,14 @@ def edit_profile_view(request):
         user.username = username
         user.email = email
         user.bio = bio
+        fields = ['first_name', 'last_name', 'username', 'email', 'bio']
 
         if 'profile_picture' in request.FILES:
             user.profile_picture = request.FILES['profile_picture']
+            fields.append('profile_picture')
 
-        user.save()
+        # Only the edited columns: a full save would write back stale counters
+        user.save(update_fields=fields)
         messages.success(request, "Profile updated successfully.")
         return redirect('profile')
 
@@ -224,15 +239,12 @@ def restaurant_dashboard_view(request):
     if not user.is_approved:
         return render(request, 'not_approved.html')
 
-    recipes = Recipe.objects.filter(author=user)
+    recipes = Recipe.objects.for_cards(user).filter(author=user)
     promotions = SpecialOffer.objects.filter(restaurant=user).order_by('-start_date')
-    unread_notification_count = user.notifications.filter(is_read=False).count()
-
     return render(request, 'restaurant_dashboard.html', {
         'user': user,
         'recipes': recipes,
         'promotions': promotions,
-        'unread_notification_count': unread_notification_count,
     })
 
 @login_required
@@ -243,16 +255,23 @@ def edit_restaurant_profile_view(request):
         return redirect('profile')
 
     if request.method == 'POST':
+        error = upload_error(request)
+        if error:
+            return render(request, 'edit_restaurant_profile.html', {'user': user, 'error': error})
+
         user.restaurant_name = request.POST.get('restaurant_name')
         user.restaurant_location = request.POST.get('restaurant_location')
         user.bio = request.POST.get('bio')
         user.contact_number = request.POST.get('contact_number')
         user.opening_hours = request.POST.get('opening_hours')
+        fields = ['restaurant_name', 'restaurant_location', 'bio', 'contact_number', 'opening_hours']
 
         if request.FILES.get('profile_picture'):
             user.profile_picture = request.FILES['profile_picture']
+            fields.append('profile_picture')
 
-        user.save()
+        # Only the edited columns: a full save would write back stale counters
+        user.save(update_fields=fields)
         messages.success(request, "Profile updated successfully.")
         return redirect('restaurant_dashboard')
 
@@ -262,6 +281,10 @@ def edit_restaurant_profile_view(request):
 @login_required
 def add_recipe_view(request):
     if request.method == 'POST':
+        error = upload_error(request)
+        if error:
+            return render(request, 'add_recipe.html', {'error': error})
+
         title = request.POST.get('title')
         description = request.POST.get('description')
         ingredients = request.POST.get('ingredients')
@@ -283,14 +306,17 @@ def add_recipe_view(request):
             difficulty=difficulty,
             image=image,
             author=request.user,
+            trending_score=trending.initial_score(),
             is_promoted=is_promoted if request.user.user_type == 'restaurant' else False
         )
 
         if tag_input:
             tag_names = [t.strip().lower() for t in tag_input.split(',') if t.strip()]
-            for tag_name in tag_names:
-                tag, created = Tag.objects.get_or_create(name=tag_name)
-                recipe.tags.add(tag)
+            tags = [Tag.objects.get_or_create(name=tag_name)[0] for tag_name in tag_names]
+            recipe.tags.add(*tags)
+
+        timeline.add_own_recipe(recipe)
+        tasks.enqueue('fan_out_recipe', recipe_id=recipe.id)
 
         return redirect('feed')
 
@@ -301,6 +327,10 @@ def edit_recipe(request, pk):
     recipe = get_object_or_404(Recipe, pk=pk, author=request.user)
 
     if request.method == 'POST':
+        error = upload_error(request)
+        if error:
+            return render(request, 'edit_recipe.html', {'recipe': recipe, 'error': error})
+
         recipe.title = request.POST.get('title')
         recipe.description = request.POST.get('description')
         recipe.ingredients = request.POST.get('ingredients')
@@ -309,11 +339,15 @@ def edit_recipe(request, pk):
         recipe.servings = request.POST.get('servings')
         recipe.difficulty = request.POST.get('difficulty')
         recipe.is_promoted = bool(request.POST.get('is_promoted'))
+        fields = ['title', 'description', 'ingredients', 'instructions', 'cook_time', 'servings',
+                  'difficulty', 'is_promoted']
 
         if 'image' in request.FILES:
             recipe.image = request.FILES['image']
+            fields.append('image')
 
-        recipe.save()
+        # Only the edited columns: a full save would write back a stale like_count
+        recipe.save(update_fields=fields)
         return redirect('profile')
 
     return render(request, 'edit_recipe.html', {'recipe': recipe})
@@ -323,7 +357,7 @@ def delete_recipe(request, pk):
     recipe = get_object_or_404(Recipe, pk=pk, author=request.user)
 
     if request.method == 'POST':
-        recipe.delete()
+        recipe.delete()  # timeline entries go with it (FeedEntry.recipe cascades)
         return redirect('profile')
 
     return render(request, 'delete_recipe.html', {'recipe': recipe})
@@ -334,19 +368,35 @@ from django.utils import timezone
 from django.views.decorators.cache import never_cache
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
-from .models import Recipe, SpecialOffer, CustomUser
+from .models import Recipe, SpecialOffer, CustomUser, FeedEntry, FollowSuggestion
+
+
+def recipe_cards_response(request, template, page, **context):
+    # JSON fragment for the "Load more" button under each recipe list.
+    html = render_to_string(template, {'recipes': page.items, **context}, request=request)
+    return JsonResponse({'html': html, 'next_cursor': page.next_cursor})
+
+
+def feed_page(user, cursor):
+    # Recipes from followed users and the current user, read from the
+    # materialized timeline (see myapp/timeline.py)
+    entries = paginate(FeedEntry.objects.filter(user=user), cursor, fields=('created_at', 'recipe'))
+    recipes = Recipe.objects.for_cards(user).in_bulk([entry.recipe_id for entry in entries.items])
+    return Page(
+        [recipes[entry.recipe_id] for entry in entries.items if entry.recipe_id in recipes],
+        entries.next_cursor,
+    )
+
+
+def followed_among(user, user_ids):
+    # Follow-button state for just the users shown on the page
+    return set(user.following.filter(id__in=set(user_ids)).values_list('id', flat=True))
+
 
 @never_cache
 @login_required
 def feed_view(request):
-    # Get the list of user IDs the current user follows
-    followed_user_ids = list(request.user.following.values_list('id', flat=True))
-    
-    # Include current user ID as well to show their own recipes
-    relevant_user_ids = followed_user_ids + [request.user.id]
-
-    # Only show recipes from followed users and the current user
-    recipes = Recipe.objects.filter(author__id__in=relevant_user_ids).order_by('-created_at')
+    page = feed_page(request.user, None)
 
     # Promoted recipes (optional: you could also filter by relevant_user_ids if needed)
     promoted_recipes = Recipe.objects.filter(is_promoted=True).order_by('-updated_at')[:5]
@@ -357,11 +407,19 @@ def feed_view(request):
         end_date__gte=timezone.now().date()
     ).order_by('-start_date')[:5]
 
-    # Suggest other users to follow
-    other_users = CustomUser.objects.exclude(id=request.user.id)[:5]
+    # Suggest other users to follow, precomputed by `manage.py compute_follow_suggestions`
+    other_users = [
+        suggestion.suggested_user
+        for suggestion in request.user.follow_suggestions.select_related('suggested_user')[:5]
+    ]
+    followed_user_ids = followed_among(
+        request.user,
+        [recipe.author_id for recipe in page.items] + [other.id for other in other_users],
+    )
 
     return render(request, 'feed.html', {
-        'recipes': recipes,
+        'recipes': page.items,
+        'next_cursor': page.next_cursor,
         'promoted_recipes': promoted_recipes,
         'promotions': promotions,
         'other_users': other_users,
@@ -369,27 +427,58 @@ def feed_view(request):
     })
 
 
+@never_cache
+@login_required
+def feed_more(request):
+    page = feed_page(request.user, request.GET.get('cursor'))
+    followed_user_ids = followed_among(request.user, [recipe.author_id for recipe in page.items])
+    return recipe_cards_response(request, 'partials/recipe_cards.html', page,
+                                 followed_user_ids=followed_user_ids)
+
+
 
 
 
 
 
 #---------------PUBLIC FEED----------------
+TRENDING_ON_EXPLORE = 6
+
+
+def explore_recipes(user):
+    # Exclude recipes from followed users and the current user
+    return Recipe.objects.for_cards(user).unfollowed_by(user)
+
+
+def explore_page(user, cursor):
+    return paginate(explore_recipes(user), cursor)
+
+
 @login_required
 @never_cache
 def explore_view(request):
-    followed_user_ids = list(request.user.following.values_list('id', flat=True))
+    page = explore_page(request.user, None)
 
-    # Exclude recipes from followed users and the current user
-    explore_recipes = Recipe.objects.exclude(
-        author__id__in=followed_user_ids + [request.user.id]
-    ).order_by('-created_at')
+    # Best-scoring recipes from the cached trending list (see myapp/trending.py)
+    top_ids = trending.top_recipe_ids()
+    candidates = explore_recipes(request.user).in_bulk(top_ids)
+    trending_recipes = [candidates[pk] for pk in top_ids if pk in candidates][:TRENDING_ON_EXPLORE]
 
     return render(request, 'explore.html', {
-        'explore_recipes': explore_recipes
+        'trending_recipes': trending_recipes,
+        'explore_recipes': page.items,
+        'next_cursor': page.next_cursor,
     })
 
 
+@login_required
+@never_cache
+def explore_more(request):
+    page = explore_page(request.user, request.GET.get('cursor'))
+    return recipe_cards_response(request, 'partials/recipe_cards.html', page,
+                                 card_col='col-md-6 col-lg-4')
+
+
 
 
 
@@ -411,21 +500,14 @@ def follow_user(request, user_id):
     if request.method == 'POST':
         target_user = get_object_or_404(CustomUser, id=user_id)
         if target_user != request.user:
-            if target_user in request.user.following.all():
-                request.user.following.remove(target_user)
+            if request.user.unfollow(target_user):
+                timeline.prune_author(request.user, target_user)
                 return JsonResponse({'status': 'unfollowed'})
             else:
-                request.user.following.add(target_user)
-
-                # Notification: Wrap in try-except to avoid crashing if Notification fails
-                try:
-                    Notification.objects.create(
-                        user=target_user,
-                        message=f"{request.user.username} started following you."
-                    )
-                except Exception as e:
-                    print("Notification error:", e)  # Optional: log error
-
+                request.user.follow(target_user)
+                FollowSuggestion.objects.filter(user=request.user, suggested_user=target_user).delete()
+                tasks.enqueue('backfill_author', user_id=request.user.id, author_id=target_user.id)
+                tasks.enqueue('notify_follow', user_id=target_user.id, follower_id=request.user.id)
                 return JsonResponse({'status': 'followed'})
     return JsonResponse({'status': 'error'}, status=400)
 
@@ -434,7 +516,8 @@ def unfollow_user(request, user_id):
     if request.method == 'POST':
         target_user = get_object_or_404(CustomUser, id=user_id)
         if target_user != request.user:
-            request.user.following.remove(target_user)
+            request.user.unfollow(target_user)
+            timeline.prune_author(request.user, target_user)
         return JsonResponse({'status': 'unfollowed'})
 
 
@@ -442,30 +525,31 @@ def unfollow_user(request, user_id):
 
 # ----------------LIKE/UNLIKE--------------------
 from django.http import JsonResponse
-from .models import Like, Notification
+from .models import Like, RecipeIngredient
 
 @login_required
 def toggle_like(request, recipe_id):
     recipe = Recipe.objects.get(id=recipe_id)
-    like, created = Like.objects.get_or_create(user=request.user, recipe=recipe)
-
-    if not created:
-        like.delete()
-        liked = False
-    else:
-        liked = True
-        if recipe.author != request.user:
-            Notification.objects.create(
-            to_user=recipe.author,
-            from_user=request.user,
-            notification_type='like',
-            recipe=recipe,
-            message=f"{request.user.get_display_name()} liked your recipe '{recipe.title}'."
-            )  
+
+    with transaction.atomic():
+        like, created = Like.objects.get_or_create(user=request.user, recipe=recipe)
+        if not created:
+            like.delete()
+            Recipe.objects.filter(pk=recipe.pk, like_count__gt=0).update(like_count=F('like_count') - 1)
+            trending.record_unlike(recipe.pk, like.created_at)
+            liked = False
+        else:
+            Recipe.objects.filter(pk=recipe.pk).update(like_count=F('like_count') + 1)
+            trending.record_like(recipe.pk, like.created_at)
+            liked = True
+    recipe.refresh_from_db(fields=['like_count'])
+
+    if recipe.author_id != request.user.id:
+        tasks.enqueue('notify_like' if liked else 'unnotify_like', recipe_id=recipe.id, user_id=request.user.id)
 
     return JsonResponse({
         'liked': liked,
-        'likes_count': recipe.likes.count()
+        'likes_count': recipe.like_count
     })
 
 
@@ -473,11 +557,31 @@ def toggle_like(request, recipe_id):
 
 # -----------NOTIFICATION------------
 
+def notifications_page(user, cursor):
+    return paginate(user.notifications.select_related('recipe'), cursor, fields=('timestamp', 'id'))
+
+
 @login_required
 def all_notifications(request):
-    user_notifications = request.user.notifications.all()
-    user_notifications.update(is_read=True)
-    return render(request, 'notifications/all.html', {'notifications': user_notifications})
+    page = notifications_page(request.user, None)
+    notifications.mark_read(request.user, page.items)
+    return render(request, 'notifications/all.html', {
+        'notifications': page.items,
+        'next_cursor': page.next_cursor,
+    })
+
+
+@login_required
+def notifications_more(request):
+    page = notifications_page(request.user, request.GET.get('cursor'))
+    notifications.mark_read(request.user, page.items)
+    html = render_to_string('partials/notification_items.html', {'notifications': page.items}, request=request)
+    return JsonResponse({'html': html, 'next_cursor': page.next_cursor})
+
+
+@login_required
+def unread_notification_count(request):
+    return JsonResponse({'unread': request.user.num_unread_notifications})
 
 
 
@@ -487,50 +591,39 @@ def all_notifications(request):
 
 
 
-def inbox_view(request):
-    # Get all users who have sent or received messages with the current user
-    messages = Message.objects.filter(Q(sender=request.user) | Q(recipient=request.user))
-    user_ids = set()
+def inbox_page(user, cursor):
+    # Newest threads first, straight off the (user, last_message_at) index
+    conversations = Conversation.objects.filter(user=user).select_related('other_user', 'last_message')
+    return paginate(conversations, cursor, fields=('last_message_at', 'id'))
 
-    for msg in messages:
-        if msg.sender != request.user:
-            user_ids.add(msg.sender.id)
-        if msg.recipient != request.user:
-            user_ids.add(msg.recipient.id)
 
-    users = User.objects.filter(id__in=user_ids)
-    conversations = []
+@login_required
+def inbox_view(request):
+    page = inbox_page(request.user, None)
+    return render(request, 'messaging/inbox.html', {
+        'conversations': page.items,
+        'next_cursor': page.next_cursor,
+    })
 
-    for user in users:
-        last_msg = Message.objects.filter(
-            Q(sender=request.user, recipient=user) |
-            Q(sender=user, recipient=request.user)
-        ).order_by('-timestamp').first()
 
-        unread = Message.objects.filter(sender=user, recipient=request.user, is_read=False).count()
+@login_required
+def inbox_more(request):
+    page = inbox_page(request.user, request.GET.get('cursor'))
+    html = render_to_string('partials/inbox_conversations.html', {'conversations': page.items}, request=request)
+    return JsonResponse({'html': html, 'next_cursor': page.next_cursor})
 
-        conversations.append({
-            'id': user.id,
-            'username': user.username,
-            'profile_picture': getattr(user, 'profile_picture', None),
-            'last_message': last_msg.message if last_msg else "",
-            'unread_count': unread,
-        })
 
-    return render(request, 'messaging/inbox.html', {'conversations': conversations})
+def conversation_page(user, other_user, cursor):
+    # Newest messages first; the template shows them oldest-first. Each
+    # direction is read off message_thread_idx and the two pages merged.
+    sent = Message.objects.filter(sender=user, recipient=other_user).select_related('recipe')
+    received = Message.objects.filter(sender=other_user, recipient=user).select_related('recipe')
+    return paginate_union([sent, received], cursor, fields=('timestamp', 'id'))
 
 
 @login_required
 def conversation_view(request, user_id):
     other_user = get_object_or_404(CustomUser, id=user_id)
-    messages = Message.objects.filter(
-        Q(sender=request.user, recipient=other_user) | 
-        Q(sender=other_user, recipient=request.user)
-    ).order_by('timestamp')
-
-    # Mark unread messages as read
-    unread_messages = messages.filter(recipient=request.user, is_read=False)
-    unread_messages.update(is_read=True)
 
     if request.method == 'POST':
         content = request.POST.get('message')
@@ -538,20 +631,60 @@ def conversation_view(request, user_id):
         recipe = Recipe.objects.get(id=recipe_id) if recipe_id else None
 
         if content or recipe:
-            Message.objects.create(
-                sender=request.user,
-                recipient=other_user,
-                message=content,
-                recipe=recipe
-            )
+            messaging.send_message(request.user, other_user, message=content or '', recipe=recipe)
         return redirect('conversation', user_id=other_user.id)
 
+    # Mark unread messages as read
+    messaging.mark_conversation_read(request.user, other_user)
+
+    page = conversation_page(request.user, other_user, None)
     return render(request, 'messaging/conversation.html', {
         'other_user': other_user,
-        'messages': messages,
+        'messages': page.items[::-1],
+        'next_cursor': page.next_cursor,
     })
 
 
+@login_required
+def conversation_more(request, user_id):
+    # Older messages, for "Load older" at the top of the thread
+    other_user = get_object_or_404(CustomUser, id=user_id)
+    page = conversation_page(request.user, other_user, request.GET.get('cursor'))
+    html = render_to_string('partials/messages.html', {'messages': page.items[::-1]}, request=request)
+    return JsonResponse({'html': html, 'next_cursor': page.next_cursor})
+
+
+
+
+
+
+# ----------REAL-TIME EVENTS--------------
+from django.core.handlers.asgi import ASGIRequest
+
+async def event_stream(request):
+    # Server-Sent Events: new messages and notifications for the signed-in
+    # user, pushed through myapp/realtime.py. Needs an ASGI server: under
+    # WSGI the stream would pin a server thread forever and deliver nothing.
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)  # tells EventSource not to reconnect
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=204)
+
+    async def events():
+        yield 'retry: 5000\n\n'
+        async for item in realtime.get_broker().listen(user.id):
+            if item is None:
+                yield ': keepalive\n\n'
+            else:
+                yield f"event: {item['event']}\ndata: {json.dumps(item['data'])}\n\n"
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 
 
 
@@ -560,20 +693,28 @@ def conversation_view(request, user_id):
 @login_required
 def public_profile(request, user_id):
     user = get_object_or_404(User, id=user_id)
-    recipes = Recipe.objects.filter(author=user)
-    is_following = request.user in user.followers.all()
+    page = paginate(Recipe.objects.for_cards(request.user).filter(author=user), None)
+    is_following = user.is_followed_by(request.user)
 
     offers = []
     if user.user_type == 'restaurant':
         offers = SpecialOffer.objects.filter(restaurant=user, is_active=True)
     return render(request, 'public_profile.html', {
         'profile_user': user,
-        'recipes': recipes,
+        'recipes': page.items,
+        'next_cursor': page.next_cursor,
+        'recipe_count': user.recipes.count(),
         'is_following': is_following,
         'offers': offers
     })
 
 
+@login_required
+def public_profile_recipes(request, user_id):
+    page = paginate(Recipe.objects.for_cards(request.user).filter(author_id=user_id), request.GET.get('cursor'))
+    return recipe_cards_response(request, 'partials/profile_recipe_cards.html', page)
+
+
 
 # ------------------SHARE--------------------
 
@@ -585,12 +726,7 @@ def share_recipe(request, recipe_id):
         recipe = get_object_or_404(Recipe, pk=recipe_id)
         recipient = get_object_or_404(User, pk=recipient_id)
 
-        Message.objects.create(
-            sender=request.user,
-            recipient=recipient,
-            text=text,
-            recipe=recipe
-        )
+        messaging.send_message(request.user, recipient, message=text or '', recipe=recipe)
         return redirect('conversation', user_id=recipient.id)
     
 
@@ -598,9 +734,10 @@ def share_recipe(request, recipe_id):
 @login_required
 def search_users(request):
     query = request.GET.get('q', '')
-    users = User.objects.filter(Q(username__icontains=query) | Q(first_name__icontains=query))\
-                        .exclude(id=request.user.id)[:10]
-    
+    matches = autocomplete.suggest('user', query, exclude_id=request.user.id)
+    found = User.objects.in_bulk([user_id for user_id, _ in matches])
+    users = [found[user_id] for user_id, _ in matches if user_id in found]
+
     results = []
     for user in users:
         profile_pic = user.profile_picture.url if user.profile_picture else static('images/default-avatar.png')
@@ -642,6 +779,10 @@ def create_offer(request):
         return HttpResponseForbidden("Only restaurant users can create offers.")
 
     if request.method == 'POST':
+        error = upload_error(request)
+        if error:
+            return render(request, 'add_offer.html', {'error': error})
+
         title = request.POST.get('title')
         description = request.POST.get('description')
         start_date = request.POST.get('start_date')
@@ -672,46 +813,126 @@ from .models import Recipe  # adjust if your model is named differently
 
 User = get_user_model()
 
+AJAX_SEARCH_RECIPES = 5
+
 def ajax_search(request):
     query = request.GET.get('query', '').strip()
     user_list = []
     tag_list = []
+    recipe_list = []
 
     # Search users regardless of # or not
     if not query.startswith('#'):
-        users = User.objects.filter(
-            Q(username__icontains=query) | Q(first_name__icontains=query)
-        )
         user_list = [{
-            'id': user.id,
-            'username': user.username,
-        } for user in users]
+            'id': user_id,
+            'username': username,
+        } for user_id, username in autocomplete.suggest('user', query)]
+
+        recipe_ids = search.search_recipe_ids(query, limit=AJAX_SEARCH_RECIPES)[:AJAX_SEARCH_RECIPES] if query else []
+        recipes = Recipe.objects.in_bulk(recipe_ids)
+        recipe_list = [{
+            'id': pk,
+            'title': recipes[pk].title,
+        } for pk in recipe_ids if pk in recipes]
 
     # Search tags only when query starts with #
     if query.startswith('#'):
         tag_query = query[1:]  # remove the #
-        tag_list = list(
-            Tag.objects.filter(name__icontains=tag_query)
-            .values_list('name', flat=True)
-            .distinct()
-        )
+        tag_list = [name for _, name in autocomplete.suggest('tag', tag_query)]
+
+    return JsonResponse({'users': user_list, 'tags': tag_list, 'recipes': recipe_list})
+
+
+@login_required
+def search_recipes(request):
+    # Ranked full-text recipe search (see myapp/search.py)
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+
+    recipe_ids = search.search_recipe_ids(query, page) if query else []
+    has_next = len(recipe_ids) > search.PAGE_SIZE
+    recipe_ids = recipe_ids[:search.PAGE_SIZE]
+
+    recipes = Recipe.objects.select_related('author').in_bulk(recipe_ids)
+    results = []
+    for pk in recipe_ids:
+        if pk not in recipes:
+            continue
+        recipe = recipes[pk]
+        results.append({
+            'id': recipe.id,
+            'title': recipe.title,
+            'author': recipe.author.get_display_name(),
+            'image': recipe.image.url if recipe.image else None,
+            'url': recipe.get_absolute_url(),
+        })
+
+    return JsonResponse({'results': results, 'next_page': page + 1 if has_next else None})
+
 
-    return JsonResponse({'users': user_list, 'tags': tag_list})
 
 
+RELATED_TAGS = 8
 
 
 def tagged_recipes(request, tag_name):
     tag = get_object_or_404(Tag, name=tag_name)
-    recipes = Recipe.objects.filter(tags=tag).order_by('-created_at')
+    page = paginate(Recipe.objects.for_cards(request.user).filter(tags=tag), None)
 
     context = {
         'tag': tag,
-        'recipes': recipes,
+        'related_tags': tag.related_tags.select_related('related_tag')[:RELATED_TAGS],
+        'recipes': page.items,
+        'next_cursor': page.next_cursor,
     }
     return render(request, 'tagged_recipes.html', context) 
 
 
+def tagged_recipes_more(request, tag_id):
+    tag = get_object_or_404(Tag, pk=tag_id)
+    page = paginate(Recipe.objects.for_cards(request.user).filter(tags=tag), request.GET.get('cursor'))
+    return recipe_cards_response(request, 'partials/tagged_recipe_cards.html', page)
+
+
+
+
+
+# ---------- COOK WITH WHAT I HAVE ----------
+@login_required
+def pantry_search(request):
+    # ?ingredients=eggs, flour, milk -> recipes ranked by pantry coverage
+    pantry = [item for item in request.GET.get('ingredients', '').split(',') if item.strip()]
+    ranked = ingredient_index.pantry_search(pantry)
+    recipe_ids = [recipe_id for recipe_id, _, _ in ranked]
+
+    recipes = Recipe.objects.select_related('author').in_bulk(recipe_ids)
+    missing = {}
+    have = ingredient_index.tokenize('\n'.join(pantry))
+    for recipe_id, name in RecipeIngredient.objects.filter(recipe_id__in=recipe_ids) \
+            .exclude(ingredient__name__in=have).values_list('recipe_id', 'ingredient__name'):
+        missing.setdefault(recipe_id, []).append(name)
+
+    results = []
+    for recipe_id, matched, total in ranked:
+        if recipe_id not in recipes:
+            continue
+        recipe = recipes[recipe_id]
+        results.append({
+            'id': recipe.id,
+            'title': recipe.title,
+            'author': recipe.author.get_display_name(),
+            'url': recipe.get_absolute_url(),
+            'matched': matched,
+            'total': total,
+            'coverage': round(matched / total, 2),
+            'missing': sorted(missing.get(recipe_id, [])),
+        })
+
+    return JsonResponse({'results': results})
+
 
 
 
@@ -723,3 +944,12 @@ from django.shortcuts import get_object_or_404
 def promotion_detail(request, promo_id):
     promotion = get_object_or_404(SpecialOffer, id=promo_id, is_active=True)
     return render(request, 'promotion_detail.html', {'promotion': promotion})
+
+
+
+# ---------- MEDIA ----------
+@require_safe
+def serve_media(request, path):
+    # Uploaded files, with ETag/Range support and optional X-Sendfile
+    # offload (see myapp/media.py)
+    return media.serve(request, path)
@@ -65,6 +65,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'myapp.context_processors.unread_message_count',
+                'myapp.context_processors.unread_notification_count',
 
             ],
         },
@@ -81,6 +82,13 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # The job worker (manage.py run_worker) writes from several threads
+        # alongside the web process: take the write lock when a transaction
+        # starts and wait for it, instead of failing with "database is locked".
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -133,5 +141,46 @@ AUTH_USER_MODEL = 'myapp.CustomUser'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Shared by every web process and the job worker: cached counters
+# (myapp/counters.py) and the trending top list are updated in place, so a
+# per-process cache would serve stale values. The table is created by
+# migration 0034.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    },
+}
 
+# Uploads are stored once per distinct content (myapp/storage.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'myapp.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
 
+
+# Real-time push (myapp/realtime.py). DatabaseBroker carries events from
+# `manage.py run_worker` and between ASGI processes; LocalBroker only reaches
+# clients of the publishing process.
+REALTIME_BROKER = 'myapp.realtime.DatabaseBroker'
+
+# Media is served by views.serve_media (myapp/media.py). Behind nginx or
+# Apache, set this to 'x-accel-redirect' or 'x-sendfile' so the web server
+# sends the file bytes; for nginx also add an `internal` location at
+# MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT.
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Uploads stream straight to a temp file (myapp/uploadhandlers.py). Image
+# fields are checked for a JPEG/PNG/GIF/WebP signature and cut off at their
+# byte cap; a request over UPLOAD_MAX_REQUEST_SIZE is dropped unread.
+FILE_UPLOAD_HANDLERS = ['myapp.uploadhandlers.BoundedImageUploadHandler']
+IMAGE_UPLOAD_LIMITS = {
+    'image': 8 * 1024 * 1024,
+    'profile_picture': 4 * 1024 * 1024,
+}
+UPLOAD_MAX_REQUEST_SIZE = 16 * 1024 * 1024
@@ -18,7 +18,6 @@ from django.contrib import admin
 from django.urls import path
 from myapp import views
 from django.conf import settings
-from django.conf.urls.static import static
 
 
 
@@ -39,7 +38,9 @@ urlpatterns = [
     path('restaurant/edit-dashboard/', views.edit_restaurant_profile_view, name='edit_restaurant_profile'),
     path('add-recipe/', views.add_recipe_view, name='add_recipe'),
     path('feed/', views.feed_view, name='feed'),
+    path('feed/more/', views.feed_more, name='feed_more'),
     path('explore/', views.explore_view, name='explore'), 
+    path('explore/more/', views.explore_more, name='explore_more'),
     path('recipe/<int:pk>/', views.recipe_detail_view, name='recipe_detail'),
     path('recipe/<int:pk>/edit/', views.edit_recipe, name='edit_recipe'),
     path('recipe/<int:pk>/delete/', views.delete_recipe, name='delete_recipe'),
@@ -47,18 +48,29 @@ urlpatterns = [
     path('unfollow/<int:user_id>/', views.unfollow_user, name='unfollow_user'),
     path('recipe/<int:recipe_id>/like/', views.toggle_like, name='toggle_like'),
     path('notifications/', views.all_notifications, name='all_notifications'),
+    path('notifications/more/', views.notifications_more, name='notifications_more'),
+    path('notifications/unread-count/', views.unread_notification_count, name='unread_notification_count'),
     path('inbox/', views.inbox_view, name='inbox'),
+    path('inbox/more/', views.inbox_more, name='inbox_more'),
     path('conversation/<int:user_id>/', views.conversation_view, name='conversation'),
+    path('conversation/<int:user_id>/more/', views.conversation_more, name='conversation_more'),
+    path('events/', views.event_stream, name='events'),
     path('user/<int:user_id>/', views.public_profile, name='public_profile'),
+    path('user/<int:user_id>/recipes/', views.public_profile_recipes, name='public_profile_recipes'),
     path('share/<int:recipe_id>/', views.share_recipe, name='share_recipe'),
     path('search-users/', views.search_users, name='search_users'),
     path('offers/create/', views.create_offer, name='create_offer'),
     path('ajax-search/', views.ajax_search, name='ajax_search'),
-    path('tagged/<str:tag_name>/', views.tagged_recipes, name='tagged_recipes'),
+    path('search/recipes/', views.search_recipes, name='search_recipes'),
+    path('recipes/pantry/', views.pantry_search, name='pantry_search'),
+    # Tag names are free text and may contain '/'
+    path('tagged/<path:tag_name>/', views.tagged_recipes, name='tagged_recipes'),
+    path('tags/<int:tag_id>/more/', views.tagged_recipes_more, name='tagged_recipes_more'),
     path('promotions/<int:promo_id>/', views.promotion_detail, name='promotion_detail'),
 
 
 
-]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", views.serve_media, name='media'),
+]
 
 